@@ -0,0 +1,8 @@
+import os
+from backend.app import create_asgi_app
+
+app = create_asgi_app()
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 5001))
+    app.run(host='0.0.0.0', port=port)
@@ -1,11 +1,58 @@
-from flask import Flask
-from flask_cors import CORS
+from .startup import import_timer
+
+def finish_startup():
+    """Print the startup report and start the optional warmup in the background"""
+    from .startup import print_report
+    print_report()
+    
+    from .config import WARMUP_ON_START
+    if WARMUP_ON_START:
+        import threading
+        from .routes import warmup
+        threading.Thread(target=warmup, name='warmup', daemon=True).start()
 
 def create_app():
-    app = Flask(__name__)
-    CORS(app)
+    # Time every import the first app pulls in, for the startup report; __import__ is restored
+    # even if creating the app fails
+    timing = import_timer.start()
+    try:
+        from flask import Flask
+        from flask_cors import CORS
+        
+        app = Flask(__name__)
+        CORS(app)
+        
+        from .routes import main
+        app.register_blueprint(main)
+    finally:
+        import_timer.stop()
+    
+    if timing:
+        finish_startup()
+    return app
+
+def create_asgi_app():
+    """Asyncio serving mode for the same API, e.g. `hypercorn asgi:app`"""
+    timing = import_timer.start()
+    try:
+        from quart import Quart
+        from quart_cors import cors
+        
+        app = cors(Quart(__name__))
+        
+        from .asgi import main, finnhub_async
+        app.register_blueprint(main)
+    finally:
+        import_timer.stop()
+    
+    @app.before_serving
+    async def open_clients():
+        await finnhub_async.open()
     
-    from .routes import main
-    app.register_blueprint(main)
+    @app.after_serving
+    async def close_clients():
+        await finnhub_async.close()
     
+    if timing:
+        finish_startup()
     return app
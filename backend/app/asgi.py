@@ -0,0 +1,244 @@
+import asyncio
+from quart import Blueprint, Response, jsonify, request
+
+from data.scheduler import scheduler, RateLimited, PRIORITY_QUOTE
+from . import routes, wire
+from .async_client import AsyncFinnhubClient
+from .config import ASYNC_MAX_CONNECTIONS, UPSTREAM_TIMEOUT, QUOTE_STREAM_HEARTBEAT
+from .streams import async_queue_delivery
+
+# Same endpoints as routes.main, served from an event loop. Finnhub quote and
+# profile lookups use a non-blocking client (still budgeted by the shared
+# upstream scheduler); yfinance and TensorFlow work has no async API, so it
+# runs on the shared upstream thread pool.
+main = Blueprint('main', __name__)
+finnhub_async = AsyncFinnhubClient(routes.API_KEY, max_connections=ASYNC_MAX_CONNECTIONS, timeout=UPSTREAM_TIMEOUT)
+
+async def scheduled(call, priority=PRIORITY_QUOTE):
+    """Wait for a Finnhub slot from the shared scheduler, then make the async call"""
+    await asyncio.wrap_future(scheduler.reserve('finnhub', priority=priority))
+    return await call()
+
+def in_pool(fn, *args):
+    """Run blocking provider work on the bounded upstream pool without blocking the event loop"""
+    return asyncio.get_running_loop().run_in_executor(routes.upstream_pool, fn, *args)
+
+async def profile_result(ticker):
+    try:
+        symbol = ticker.upper()
+        profile = await routes.profile_cache.get_or_load_async(
+            symbol, lambda: scheduled(lambda: finnhub_async.company_profile2(symbol=symbol)), cacheable=bool)
+        return routes.check_profile(ticker, profile)
+    except RateLimited as e:
+        return routes.stale_or_error(routes.profile_cache, ticker, e)
+    except Exception as e:
+        return routes.upstream_error(e)
+
+async def quote_result(ticker):
+    try:
+        print(f"Fetching quote for {ticker}...")
+        symbol = ticker.upper()
+        quote = await routes.quote_cache.get_or_load_async(
+            symbol, lambda: scheduled(lambda: finnhub_async.quote(symbol)), cacheable=routes.is_valid_quote)
+        return routes.check_quote(ticker, quote)
+    except RateLimited as e:
+        return routes.stale_or_error(routes.quote_cache, ticker, e)
+    except Exception as e:
+        print(f"Error fetching quote for {ticker}: {str(e)}")
+        return routes.upstream_error(e)
+
+@main.route('/api/health', methods=['GET'])
+async def health_check():
+    return jsonify({"status": "ok"})
+
+@main.route('/api/health/startup', methods=['GET'])
+async def startup_status():
+    return jsonify(routes.startup.report())
+
+@main.route('/api/health/providers', methods=['GET'])
+async def provider_status():
+    return jsonify({'providers': routes.provider_health.snapshot(), 'scheduler': scheduler.status(),
+                    'quote_streams': routes.quote_hub.status()})
+
+@main.route('/api/stock/profile/<ticker>', methods=['GET'])
+async def get_company_profile(ticker):
+    cached = not_modified()
+    if cached:
+        return cached
+    payload, status = await profile_result(ticker)
+    return await encoded_response(payload, status, 'json', routes.max_age('profile'))
+
+@main.route('/api/stock/quote/<ticker>', methods=['GET'])
+async def get_stock_quote(ticker):
+    cached = not_modified()
+    if cached:
+        return cached
+    payload, status = await quote_result(ticker)
+    return await encoded_response(payload, status, 'json', routes.max_age('quote'))
+
+@main.route('/api/stock/quotes', methods=['GET'])
+async def get_stock_quotes():
+    cached = not_modified()
+    if cached:
+        return cached
+    try:
+        tickers = routes.parse_tickers(request.args.get('tickers'))
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    
+    results = await asyncio.gather(*(quote_result(ticker) for ticker in tickers))
+    payload = routes.quotes_payload(tickers, results)
+    return await encoded_response(payload, 200, 'json', None if payload['errors'] else routes.max_age('quote'))
+
+@main.route('/api/stock/quotes/stream', methods=['GET'])
+async def stream_quotes():
+    try:
+        tickers = routes.parse_tickers(request.args.get('tickers'))
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    
+    # Shares the threaded quote hub; events are handed to this connection's loop
+    events, deliver = async_queue_delivery(asyncio.get_running_loop())
+    subscription = routes.quote_hub.subscribe(tickers, deliver)
+    print(f"DEBUG: Quote stream opened for {', '.join(tickers)}")
+    
+    async def generate():
+        try:
+            yield routes.SSE_RETRY
+            while not subscription.closed:
+                try:
+                    event = await asyncio.wait_for(events.get(), QUOTE_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield routes.SSE_KEEPALIVE
+                    continue
+                yield routes.sse_event(event)
+        finally:
+            routes.quote_hub.unsubscribe(subscription)
+            print(f"DEBUG: Quote stream closed for {', '.join(tickers)}")
+    
+    response = Response(generate(), content_type='text/event-stream', headers=routes.SSE_HEADERS)
+    response.timeout = None  # streams stay open until the client leaves
+    return response
+
+def not_modified():
+    """A 304 for the current request if the client's copy is still current, otherwise None"""
+    headers = routes.cached_validators(request.full_path, request.if_none_match)
+    if headers is None:
+        return None
+    return Response('', status=304, headers=headers)
+
+async def encoded_response(payload, status, fmt, seconds=None):
+    """Encode a payload that may hold price series off the event loop, gzipped when accepted"""
+    body, content_type = await in_pool(wire.encode, payload, fmt if status == 200 else 'json')
+    status, headers = await in_pool(routes.validate, request.full_path, body, status, seconds, request.if_none_match)
+    if status == 304:
+        return Response('', status=304, headers=headers)
+    body, encoding = await in_pool(wire.compress, body, request.headers.get('Accept-Encoding'))
+    return Response(body, status=status, content_type=content_type, headers={**headers, **encoding})
+
+async def stream_lines(lines):
+    """Pull each chunk of a blocking line generator on the pool, so store reads don't stall the loop"""
+    while True:
+        line = await in_pool(next, lines, None)
+        if line is None:
+            return
+        yield line
+
+@main.route('/api/stock/intraday/<ticker>', methods=['GET'])
+async def get_intraday_data(ticker):
+    cached = not_modified()
+    if cached:
+        return cached
+    
+    try:
+        fmt = routes.parse_format(request.args, streaming=True)
+        interval, days = routes.parse_chart_args(
+            request.args, routes.STREAM_MAX_DAYS if fmt == routes.STREAM_FORMAT else 365)
+        max_points = routes.parse_max_points(request.args)
+        since = routes.parse_since(request.args)
+        if since is not None and fmt == routes.STREAM_FORMAT:
+            raise ValueError("since is not supported with format=ndjson")
+    except ValueError as ve:
+        print(f"Validation error for {ticker}: {str(ve)}")
+        return jsonify({"error": str(ve)}), 400
+    
+    if fmt == routes.STREAM_FORMAT:
+        try:
+            lines = await in_pool(routes.stream_bars, ticker, interval, days)
+        except Exception as e:
+            print(f"Error streaming data for {ticker}: {str(e)}")
+            payload, status = routes.upstream_error(e)
+            return jsonify(payload), status
+        return Response(stream_lines(lines), content_type='application/x-ndjson')
+    
+    payload, status = await in_pool(routes.chart_result, ticker, interval, days, max_points, since)
+    return await encoded_response(payload, status, fmt, routes.max_age('chart'))
+
+@main.route('/api/stock/indicators/<ticker>', methods=['GET'])
+async def get_indicators(ticker):
+    from data.indicators import parse_specs
+    
+    cached = not_modified()
+    if cached:
+        return cached
+    
+    try:
+        interval, days = routes.parse_chart_args(request.args)
+        specs = parse_specs(request.args.get('indicators'))
+        fmt = routes.parse_format(request.args)
+    except ValueError as ve:
+        print(f"Validation error for {ticker}: {str(ve)}")
+        return jsonify({"error": str(ve)}), 400
+    
+    payload, status = await in_pool(routes.indicators_result, ticker, interval, days, specs)
+    return await encoded_response(payload, status, fmt, routes.max_age('chart'))
+
+@main.route('/api/stock/portfolio', methods=['GET'])
+async def get_portfolio():
+    cached = not_modified()
+    if cached:
+        return cached
+    
+    try:
+        tickers, chart_params = routes.parse_portfolio_args(request.args)
+        parts = routes.parse_portfolio_parts(request.args)
+        fmt = routes.parse_format(request.args)
+        max_points = routes.parse_max_points(request.args)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    
+    lookups = {}
+    for ticker in tickers:
+        if 'profile' in parts:
+            lookups[(ticker, 'profile')] = profile_result(ticker)
+        if 'quote' in parts:
+            lookups[(ticker, 'quote')] = quote_result(ticker)
+        if 'intraday' in parts:
+            interval, days, since = chart_params[ticker]
+            lookups[(ticker, 'intraday')] = in_pool(routes.chart_result, ticker, interval, days, max_points, since)
+    
+    results = await asyncio.gather(*lookups.values())
+    payload = routes.portfolio_payload(zip(lookups.keys(), results))
+    return await encoded_response(payload, 200, fmt, routes.portfolio_max_age(parts, payload))
+
+@main.route('/api/stock/predict', methods=['GET'])
+async def predict_stock_prices():
+    try:
+        tickers = routes.parse_tickers(request.args.get('tickers'))
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    
+    results = await asyncio.gather(*(in_pool(routes.batch_inputs, ticker) for ticker in tickers))
+    payload, status = await in_pool(routes.batch_predictions, tickers, results)
+    return jsonify(payload), status
+
+@main.route('/api/stock/predict/<ticker>', methods=['GET', 'POST'])
+async def predict_stock_price(ticker):
+    print(f"DEBUG: Prediction endpoint called for ticker: {ticker}")
+    payload, status = routes.submit_prediction(ticker)
+    return jsonify(payload), status
+
+@main.route('/api/stock/predict/jobs/<job_id>', methods=['GET'])
+async def get_prediction_job(job_id):
+    payload, status = routes.prediction_job(job_id)
+    return jsonify(payload), status
@@ -0,0 +1,54 @@
+import aiohttp
+
+FINNHUB_API_URL = 'https://finnhub.io/api/v1'
+
+
+class FinnhubAPIError(Exception):
+    def __init__(self, status_code, message):
+        self.status_code = status_code
+        super().__init__(f"FinnhubAPIException(status_code: {status_code}): {message}")
+
+
+class AsyncFinnhubClient:
+    """Non-blocking Finnhub REST client backed by one pooled keep-alive session.
+
+    Method names and arguments mirror finnhub.Client so handlers can swap
+    between the two without other changes.
+    """
+
+    def __init__(self, api_key, max_connections=100, timeout=10):
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._session = None
+
+    async def open(self):
+        connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60, ttl_dns_cache=300)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={'X-Finnhub-Token': self.api_key}
+        )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get(self, path, **params):
+        if self._session is None:
+            await self.open()
+        async with self._session.get(f"{FINNHUB_API_URL}{path}", params=params) as response:
+            if response.status >= 400:
+                try:
+                    message = (await response.json(content_type=None)).get('error')
+                except ValueError:
+                    message = None
+                raise FinnhubAPIError(response.status, message or await response.text())
+            return await response.json(content_type=None)
+
+    async def quote(self, symbol):
+        return await self._get('/quote', symbol=symbol)
+
+    async def company_profile2(self, **params):
+        return await self._get('/stock/profile2', **params)
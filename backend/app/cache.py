@@ -0,0 +1,147 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """A single in-progress load that other callers can wait on"""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._value = None
+        self._error = None
+
+    def resolve(self, value):
+        self._value = value
+        self._done.set()
+
+    def reject(self, error):
+        self._error = error
+        self._done.set()
+
+    def wait(self):
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a fixed TTL.
+
+    Concurrent misses for the same key are coalesced: the first caller runs
+    the loader and every other caller waits for its result instead of
+    issuing its own upstream request. Expired values are kept until evicted
+    so callers can fall back to them when upstream is unavailable.
+    """
+
+    def __init__(self, ttl, maxsize=256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}  # key -> _Flight
+        self._async_inflight = {}  # key -> asyncio.Task
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            # Expired entries stay until evicted so get_stale() can still serve them
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._lookup(key)
+        return entry[1] if entry else None
+
+    def get_stale(self, key):
+        """Return the last stored value for key even if it has expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[1] if entry else None
+
+    def set(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_or_load(self, key, loader, cacheable=None):
+        """Return the cached value for key, calling loader() once on a miss.
+
+        If cacheable is given, results for which it returns False are handed
+        back to the waiting callers but not stored.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry:
+                return entry[1]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+
+        if not leader:
+            return flight.wait()
+
+        try:
+            value = loader()
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.reject(e)
+            raise
+
+        with self._lock:
+            if cacheable is None or cacheable(value):
+                self._store(key, value)
+            self._inflight.pop(key, None)
+        flight.resolve(value)
+        return value
+
+    async def get_or_load_async(self, key, loader, cacheable=None):
+        """Asyncio counterpart of get_or_load; loader is a coroutine function.
+
+        The load runs as its own task that every caller, the first one
+        included, awaits through a shield, so cancelling any caller (e.g. a
+        client disconnecting) leaves the shared load running for the others.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry:
+                return entry[1]
+            task = self._async_inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._load_async(key, loader, cacheable))
+                # Mark failures retrieved even when every caller has gone away
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                self._async_inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _load_async(self, key, loader, cacheable):
+        try:
+            value = await loader()
+        except BaseException:
+            with self._lock:
+                self._async_inflight.pop(key, None)
+            raise
+        with self._lock:
+            if cacheable is None or cacheable(value):
+                self._store(key, value)
+            self._async_inflight.pop(key, None)
+        return value
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,58 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Quote cache: how long (seconds) a quote stays fresh and how many tickers are kept
+QUOTE_CACHE_TTL = float(os.getenv('QUOTE_CACHE_TTL', '15'))
+QUOTE_CACHE_SIZE = int(os.getenv('QUOTE_CACHE_SIZE', '512'))
+
+# Company profiles change rarely, so they are kept for hours
+PROFILE_CACHE_TTL = float(os.getenv('PROFILE_CACHE_TTL', str(6 * 60 * 60)))
+
+# Chart history is shared between sessions viewing the same ticker/range
+INTRADAY_CACHE_TTL = float(os.getenv('INTRADAY_CACHE_TTL', '60'))
+INTRADAY_CACHE_SIZE = int(os.getenv('INTRADAY_CACHE_SIZE', '256'))
+
+# HTTP caching of read endpoints: max-age (seconds) of quote and chart responses once the market has
+# closed for the day, and how many URLs' ETags are remembered to answer If-None-Match with a 304
+MARKET_CLOSED_MAX_AGE = float(os.getenv('MARKET_CLOSED_MAX_AGE', '600'))
+VALIDATOR_CACHE_SIZE = int(os.getenv('VALIDATOR_CACHE_SIZE', '4096'))
+
+# Streaming quotes (server-sent events): how often each watched ticker is polled upstream, shared by
+# every client watching it, and the longest silence (seconds) before a keep-alive comment is sent
+QUOTE_STREAM_INTERVAL = float(os.getenv('QUOTE_STREAM_INTERVAL', '15'))
+QUOTE_STREAM_HEARTBEAT = float(os.getenv('QUOTE_STREAM_HEARTBEAT', '20'))
+
+# Technical indicators: rolling state per ticker/range is kept this long (seconds) so refreshed
+# bars only update the indicators for new bars instead of recomputing the whole history
+INDICATOR_STATE_TTL = float(os.getenv('INDICATOR_STATE_TTL', str(24 * 60 * 60)))
+
+# Batch endpoints: max tickers per request and size of the upstream fan-out pool
+QUOTE_BATCH_MAX = int(os.getenv('QUOTE_BATCH_MAX', '50'))
+UPSTREAM_WORKERS = int(os.getenv('UPSTREAM_WORKERS', '8'))
+
+# Async (ASGI) mode: size of the keep-alive connection pool and per-request timeout to providers
+ASYNC_MAX_CONNECTIONS = int(os.getenv('ASYNC_MAX_CONNECTIONS', '100'))
+UPSTREAM_TIMEOUT = float(os.getenv('UPSTREAM_TIMEOUT', '10'))
+
+# Streaming (format=ndjson) chart history: bars per chunk and the longest range accepted
+STREAM_CHUNK_ROWS = int(os.getenv('STREAM_CHUNK_ROWS', '5000'))
+STREAM_MAX_DAYS = int(os.getenv('STREAM_MAX_DAYS', str(10 * 365)))
+
+# Prediction jobs: model worker processes, their memory ceiling (MB, 0 = none) before they are
+# replaced, how many jobs may wait, and how long finished results are kept (seconds)
+PREDICT_WORKERS = int(os.getenv('PREDICT_WORKERS', '1'))
+PREDICT_WORKER_MAX_RSS_MB = int(os.getenv('PREDICT_WORKER_MAX_RSS_MB', '1024'))
+PREDICT_MAX_QUEUE = int(os.getenv('PREDICT_MAX_QUEUE', '8'))
+PREDICT_JOB_RETENTION = float(os.getenv('PREDICT_JOB_RETENTION', '600'))
+
+# Predictions from up-to-date models arriving within this many milliseconds of each other run as
+# one NumPy forward pass, up to PREDICT_BATCH_MAX at a time
+PREDICT_BATCH_WINDOW_MS = float(os.getenv('PREDICT_BATCH_WINDOW_MS', '5'))
+PREDICT_BATCH_MAX = int(os.getenv('PREDICT_BATCH_MAX', '64'))
+
+# Load the chart/prediction dependencies in the background right after startup instead of on
+# first use; WARMUP_MODEL_WORKERS also starts the model worker processes and loads TensorFlow there
+WARMUP_ON_START = os.getenv('WARMUP_ON_START', 'false').lower() in ('1', 'true', 'yes')
+WARMUP_MODEL_WORKERS = os.getenv('WARMUP_MODEL_WORKERS', 'false').lower() in ('1', 'true', 'yes')
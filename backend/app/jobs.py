@@ -0,0 +1,85 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueueFull(Exception):
+    """Raised when max_pending jobs are already queued or running"""
+
+
+class JobQueue:
+    """Background jobs that return (payload, status_code), polled by id.
+
+    Submitting a key that already has a queued or running job returns that
+    job instead of starting another one; a new key is rejected with
+    JobQueueFull once max_pending jobs are active. Finished jobs are kept for
+    `retention` seconds so clients can collect their result.
+    """
+
+    def __init__(self, run, workers=1, retention=600, max_pending=8, name='jobs'):
+        self.run = run
+        self.retention = retention
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._jobs = {}  # job id -> job dict
+        self._active = {}  # key -> job id while queued or running
+        self._lock = threading.Lock()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job['finished_at'] is not None and job['finished_at'] < cutoff]:
+            del self._jobs[job_id]
+
+    def submit(self, key, *args):
+        """Queue run(*args) unless a job for key is already active; returns the job's state"""
+        with self._lock:
+            self._prune()
+            job_id = self._active.get(key)
+            if job_id is not None:
+                return self._view(self._jobs[job_id])
+            if len(self._active) >= self.max_pending:
+                raise JobQueueFull(f"{len(self._active)} jobs are already waiting, please try again later")
+            job = {
+                'job_id': uuid.uuid4().hex,
+                'key': key,
+                'status': 'queued',
+                'submitted_at': time.time(),
+                'finished_at': None,
+                'result': None,
+                'status_code': None,
+            }
+            self._jobs[job['job_id']] = job
+            self._active[key] = job['job_id']
+            view = self._view(job)
+        self._executor.submit(self._execute, job, args)
+        return view
+
+    def _execute(self, job, args):
+        with self._lock:
+            job['status'] = 'running'
+        try:
+            payload, status = self.run(*args)
+        except Exception as e:
+            payload, status = {'error': str(e)}, 500
+        with self._lock:
+            job['result'], job['status_code'] = payload, status
+            job['status'] = 'done' if status == 200 else 'failed'
+            job['finished_at'] = time.time()
+            self._active.pop(job['key'], None)
+
+    def _view(self, job):
+        view = {'job_id': job['job_id'], 'status': job['status']}
+        if job['status'] == 'done':
+            view['result'] = job['result']
+        elif job['status'] == 'failed':
+            view['error'] = job['result'].get('error', 'Unknown error')
+            view['status_code'] = job['status_code']
+        return view
+
+    def get(self, job_id):
+        """Current state of a job, or None if it is unknown or has expired"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._view(job) if job is not None else None
@@ -1,18 +1,40 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
+from werkzeug.http import http_date
 import finnhub
-import yfinance as yf
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 import os
 from dotenv import load_dotenv
-from data.fetch_data import DataFetcher
-from models.lstm_predictor import LSTMPredictor
-import pandas as pd
+from data.scheduler import scheduler, RateLimited, PRIORITY_QUOTE, PRIORITY_HISTORY
+from data.provider_health import provider_health, CircuitOpen
+from models.worker_pool import ModelWorkerPool
+from models.batcher import MicroBatcher
+from .cache import TTLCache
+from .jobs import JobQueue, JobQueueFull
+from .streams import QuoteHub, queue_delivery
+from . import startup, wire
+from .config import (
+    QUOTE_CACHE_TTL, QUOTE_CACHE_SIZE, PROFILE_CACHE_TTL, INTRADAY_CACHE_TTL, INTRADAY_CACHE_SIZE, INDICATOR_STATE_TTL,
+    QUOTE_BATCH_MAX, QUOTE_STREAM_INTERVAL, QUOTE_STREAM_HEARTBEAT, UPSTREAM_WORKERS, STREAM_CHUNK_ROWS, STREAM_MAX_DAYS, PREDICT_WORKERS, PREDICT_JOB_RETENTION,
+    PREDICT_WORKER_MAX_RSS_MB, PREDICT_MAX_QUEUE, PREDICT_BATCH_WINDOW_MS, PREDICT_BATCH_MAX, WARMUP_MODEL_WORKERS,
+    MARKET_CLOSED_MAX_AGE, VALIDATOR_CACHE_SIZE
+)
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import queue
+import threading
+import time
+
+# pandas, yfinance and the chart/model modules are imported where they are first needed, so
+# the quote and health endpoints answer quickly after a cold start
 
 load_dotenv()
 
+MARKET_TZ = ZoneInfo('America/New_York')
+
 def get_market_status():
     """Determine if markets are currently open or closed"""
-    now = datetime.now()
+    now = datetime.now(MARKET_TZ)
     current_time = now.time()
     weekday = now.weekday()
     
@@ -20,7 +42,7 @@ def get_market_status():
     if weekday >= 5:
         return "closed_weekend"
     
-    # Regular trading hours: 9:30 AM - 4:00 PM ET (assuming ET timezone)
+    # Regular trading hours: 9:30 AM - 4:00 PM ET
     market_open = datetime.strptime("09:30", "%H:%M").time()
     market_close = datetime.strptime("16:00", "%H:%M").time()
     
@@ -37,8 +59,50 @@ if not API_KEY:
 
 print(f"Initializing Finnhub client with API key: {API_KEY[:5]}...{API_KEY[-5:]}")
 finnhub_client = finnhub.Client(api_key=API_KEY)
-fetcher = DataFetcher()
-predictor = LSTMPredictor()
+_fetcher = None
+_fetcher_lock = threading.Lock()
+quote_cache = TTLCache(QUOTE_CACHE_TTL, maxsize=QUOTE_CACHE_SIZE)
+profile_cache = TTLCache(PROFILE_CACHE_TTL, maxsize=QUOTE_CACHE_SIZE)
+intraday_cache = TTLCache(INTRADAY_CACHE_TTL, maxsize=INTRADAY_CACHE_SIZE)
+bars_cache = TTLCache(INTRADAY_CACHE_TTL, maxsize=INTRADAY_CACHE_SIZE)
+indicators_cache = TTLCache(INTRADAY_CACHE_TTL, maxsize=INTRADAY_CACHE_SIZE)
+indicator_engines = TTLCache(INDICATOR_STATE_TTL, maxsize=INTRADAY_CACHE_SIZE)
+# Validators of the last response sent per URL, so a matching If-None-Match is answered before any work
+response_validators = TTLCache(PROFILE_CACHE_TTL, maxsize=VALIDATOR_CACHE_SIZE)
+upstream_pool = ThreadPoolExecutor(max_workers=UPSTREAM_WORKERS, thread_name_prefix='upstream')
+
+def get_fetcher():
+    """The shared DataFetcher, created on first use"""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            started = time.perf_counter()
+            from data.fetch_data import DataFetcher
+            _fetcher = DataFetcher()
+            startup.record_lazy_load('data.fetch_data', time.perf_counter() - started)
+        return _fetcher
+
+def warmup():
+    """Load everything the chart and prediction endpoints need ahead of the first request"""
+    started = time.perf_counter()
+    get_fetcher()
+    import yfinance  # noqa: F401  (otherwise imported on the first Yahoo Finance download)
+    import data.resample, data.downsample, data.indicators, models.registry  # noqa: F401
+    if WARMUP_MODEL_WORKERS:
+        model_pool.warm()
+    print(f"DEBUG: Warmup finished in {time.perf_counter() - started:.2f}s")
+
+def is_valid_quote(quote):
+    """Only quotes with a usable current price are worth caching"""
+    return isinstance(quote, dict) and bool(quote.get('c'))
+
+def fetch_quote(ticker):
+    """Get a quote through the shared TTL cache, coalescing concurrent misses"""
+    ticker = ticker.upper()
+    return quote_cache.get_or_load(
+        ticker,
+        lambda: scheduler.call('finnhub', finnhub_client.quote, ticker, key=('quote', ticker), priority=PRIORITY_QUOTE),
+        cacheable=is_valid_quote)
 
 main = Blueprint('main', __name__)
 
@@ -46,225 +110,804 @@ main = Blueprint('main', __name__)
 def health_check():
     return jsonify({"status": "ok"})
 
+@main.route('/api/health/startup', methods=['GET'])
+def startup_status():
+    """Cold start time, the slowest imports during startup and modules loaded lazily since"""
+    return jsonify(startup.report())
+
+@main.route('/api/health/providers', methods=['GET'])
+def provider_status():
+    """Observed provider health, circuit breaker state and scheduler queue depth"""
+    return jsonify({'providers': provider_health.snapshot(), 'scheduler': scheduler.status(),
+                    'quote_streams': quote_hub.status()})
+
+def upstream_error(e):
+    """Map a provider exception to an error (payload, status_code)"""
+    if isinstance(e, RateLimited):
+        return {"error": str(e)}, 429
+    if isinstance(e, CircuitOpen):
+        return {"error": str(e)}, 503
+    if "Invalid API key" in str(e):
+        return {"error": "Invalid Finnhub API key. Please check your API key configuration."}, 401
+    return {"error": str(e)}, 400
+
+def fetch_profile(ticker):
+    """Get a company profile through the shared cache; profiles rarely change"""
+    ticker = ticker.upper()
+    return profile_cache.get_or_load(
+        ticker,
+        lambda: scheduler.call('finnhub', finnhub_client.company_profile2, symbol=ticker,
+                               key=('profile', ticker), priority=PRIORITY_QUOTE),
+        cacheable=bool)
+
+def check_profile(ticker, profile):
+    """Validate a company profile, returning (payload, status_code)"""
+    if not profile:
+        return {"error": f"No profile data found for {ticker}"}, 404
+    return profile, 200
+
+def profile_result(ticker):
+    """Fetch a company profile, returning (payload, status_code)"""
+    try:
+        return check_profile(ticker, fetch_profile(ticker))
+    except RateLimited as e:
+        return stale_or_error(profile_cache, ticker, e)
+    except Exception as e:
+        return upstream_error(e)
+
+def stale_or_error(cache, ticker, error):
+    """Serve the last cached value when the provider budget is exhausted, otherwise a 429"""
+    stale = cache.get_stale(ticker.upper())
+    if stale:
+        print(f"DEBUG: Rate limited, serving stale data for {ticker}: {str(error)}")
+        return dict(stale, stale=True), 200
+    return upstream_error(error)
+
+def max_age(kind):
+    """How long (seconds) browsers and proxies may reuse a 'profile', 'quote' or 'chart' response.
+
+    Profiles are kept as long as the server keeps them. Quotes and charts
+    follow the server caches while prices move, and are held for
+    MARKET_CLOSED_MAX_AGE once the market has closed for the day.
+    """
+    if kind == 'profile':
+        return PROFILE_CACHE_TTL
+    if get_market_status() in ('closed', 'closed_weekend'):
+        return MARKET_CLOSED_MAX_AGE
+    return QUOTE_CACHE_TTL if kind == 'quote' else INTRADAY_CACHE_TTL
+
+def validator_headers(etag, modified, seconds):
+    return {
+        'Cache-Control': f'public, max-age={max(int(seconds), 0)}',
+        'ETag': f'W/"{etag}"',
+        'Last-Modified': http_date(modified),
+    }
+
+def cached_validators(url, if_none_match):
+    """Headers for a 304 when the client holds the still-fresh ETag last sent for url, otherwise None"""
+    entry = response_validators.get(url)
+    if entry is None or not if_none_match:
+        return None
+    etag, modified, expires = entry
+    remaining = expires - time.time()
+    if remaining <= 0 or not if_none_match.contains_weak(etag):
+        return None
+    return validator_headers(etag, modified, remaining)
+
+def validate(url, body, status, seconds, if_none_match):
+    """Cache headers for an encoded (uncompressed) body, returning (status, headers).
+
+    The ETag is a hash of the body, remembered for url for `seconds` so
+    cached_validators can answer the next conditional request for it.
+    Last-Modified moves only when the body changes. Errors are not cached.
+    """
+    if status != 200 or seconds is None:
+        return status, {'Cache-Control': 'no-store'}
+    etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+    previous = response_validators.get_stale(url)
+    modified = previous[1] if previous and previous[0] == etag else time.time()
+    response_validators.set(url, (etag, modified, time.time() + seconds))
+    if if_none_match and if_none_match.contains_weak(etag):
+        status = 304
+    return status, validator_headers(etag, modified, seconds)
+
+def not_modified():
+    """A 304 for the current request if the client's copy is still current, otherwise None"""
+    headers = cached_validators(request.full_path, request.if_none_match)
+    if headers is None:
+        return None
+    return Response(status=304, headers=headers)
+
 @main.route('/api/stock/profile/<ticker>', methods=['GET'])
 def get_company_profile(ticker):
+    cached = not_modified()
+    if cached:
+        return cached
+    payload, status = profile_result(ticker)
+    return encoded_response(payload, status, 'json', max_age('profile'))
+
+def check_quote(ticker, quote):
+    """Validate a quote, returning (payload, status_code)"""
+    print(f"Raw quote response: {quote}")
+    
+    if not isinstance(quote, dict):
+        return {"error": f"Invalid response type for {ticker}: {type(quote)}"}, 500
+        
+    if not quote:
+        return {"error": f"Empty quote response for {ticker}"}, 500
+        
+    # Check if we have valid price data
+    current_price = quote.get('c')
+    if current_price is None or current_price == 0:
+        return {"error": f"Invalid price data for {ticker}"}, 500
+        
+    return quote, 200
+
+def quote_result(ticker):
+    """Fetch and validate a quote, returning (payload, status_code)"""
     try:
-        profile = finnhub_client.company_profile2(symbol=ticker)
-        if not profile:
-            return jsonify({"error": f"No profile data found for {ticker}"}), 404
-        return jsonify(profile)
+        print(f"Fetching quote for {ticker}...")
+        return check_quote(ticker, fetch_quote(ticker))
+    except RateLimited as e:
+        return stale_or_error(quote_cache, ticker, e)
     except Exception as e:
-        if "Invalid API key" in str(e):
-            return jsonify({"error": "Invalid Finnhub API key. Please check your API key configuration."}), 401
-        return jsonify({"error": str(e)}), 400
+        print(f"Error fetching quote for {ticker}: {str(e)}")
+        return upstream_error(e)
+
+def parse_tickers(raw):
+    """Split a comma-separated ticker list, normalising case and dropping duplicates"""
+    tickers = []
+    for ticker in (raw or '').split(','):
+        ticker = ticker.strip().upper()
+        if ticker and ticker not in tickers:
+            tickers.append(ticker)
+    if not tickers:
+        raise ValueError("Query parameter 'tickers' is required, e.g. ?tickers=AAPL,MSFT")
+    if len(tickers) > QUOTE_BATCH_MAX:
+        raise ValueError(f"At most {QUOTE_BATCH_MAX} tickers can be requested at once")
+    return tickers
+
+def quotes_payload(tickers, results):
+    """Split per-ticker (payload, status_code) results into a quote map and an error map"""
+    quotes, errors = {}, {}
+    for ticker, (payload, status) in zip(tickers, results):
+        if status == 200:
+            quotes[ticker] = payload
+        else:
+            errors[ticker] = payload['error']
+    return {'quotes': quotes, 'errors': errors}
 
 @main.route('/api/stock/quote/<ticker>', methods=['GET'])
 def get_stock_quote(ticker):
+    cached = not_modified()
+    if cached:
+        return cached
+    payload, status = quote_result(ticker)
+    return encoded_response(payload, status, 'json', max_age('quote'))
+
+@main.route('/api/stock/quotes', methods=['GET'])
+def get_stock_quotes():
+    cached = not_modified()
+    if cached:
+        return cached
     try:
-        print(f"Fetching quote for {ticker}...")
-        quote = finnhub_client.quote(ticker)
-        print(f"Raw quote response: {quote}")
-        
-        if not isinstance(quote, dict):
-            return jsonify({"error": f"Invalid response type for {ticker}: {type(quote)}"}), 500
-            
-        if not quote:
-            return jsonify({"error": f"Empty quote response for {ticker}"}), 500
-            
-        # Check if we have valid price data
-        current_price = quote.get('c')
-        if current_price is None or current_price == 0:
-            return jsonify({"error": f"Invalid price data for {ticker}"}), 500
-            
-        return jsonify(quote)
-    except Exception as e:
-        print(f"Error fetching quote for {ticker}: {str(e)}")
-        if "Invalid API key" in str(e):
-            return jsonify({"error": "Invalid Finnhub API key. Please check your API key configuration."}), 401
-        return jsonify({"error": str(e)}), 400
+        tickers = parse_tickers(request.args.get('tickers'))
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    
+    # Cached tickers resolve immediately; misses fan out over the bounded pool
+    payload = quotes_payload(tickers, upstream_pool.map(quote_result, tickers))
+    # A batch with failed tickers is not cached, so the next poll retries them
+    return encoded_response(payload, 200, 'json', None if payload['errors'] else max_age('quote'))
 
-@main.route('/api/stock/intraday/<ticker>', methods=['GET'])
-def get_intraday_data(ticker):
+# One poller for every streaming client: each watched ticker is fetched once per interval
+quote_hub = QuoteHub(lambda tickers: list(upstream_pool.map(quote_result, tickers)), interval=QUOTE_STREAM_INTERVAL)
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+SSE_RETRY = b'retry: 5000\n\n'
+SSE_KEEPALIVE = b': keepalive\n\n'
+
+def sse_event(event):
+    """Encode a quote hub event as a server-sent event"""
+    data = {key: value for key, value in event.items() if key != 'event'}
+    return b'event: ' + event['event'].encode() + b'\ndata: ' + wire.dumps(data) + b'\n\n'
+
+@main.route('/api/stock/quotes/stream', methods=['GET'])
+def stream_quotes():
     try:
-        # Get query parameters with defaults
-        interval = request.args.get('interval', '1h')  # Default to 1-hour intervals
-        days = int(request.args.get('days', '1'))  # Default to 1 day of data
-        
-        # Validate interval parameter
-        valid_intervals = ['1m', '5m', '15m', '30m', '1h', '1d', '1wk', '1mo']
-        if interval not in valid_intervals:
-            return jsonify({"error": f"Invalid interval. Must be one of: {', '.join(valid_intervals)}"}), 400
-            
-        # Validate days parameter
-        if days < 1 or days > 365:
-            return jsonify({"error": "Days parameter must be between 1 and 365"}), 400
-        
-        print(f"DEBUG: Fetching {ticker} data - Interval: {interval}, Days: {days}")
-        
-        # For daily data or longer intervals, try Finnhub first
-        if interval in ['1d', '1wk', '1mo'] or days > 7:
-            try:
-                # Calculate date range
-                end_date = datetime.now()
-                start_date = end_date - timedelta(days=days)
-                
-                # Convert to Unix timestamps for Finnhub API
-                start_timestamp = int(start_date.timestamp())
-                end_timestamp = int(end_date.timestamp())
-                
-                # Use daily resolution for Finnhub
-                resolution = 'D' if interval in ['1d', '1wk', '1mo'] else 'D'
-                
-                print(f"DEBUG: Trying Finnhub with resolution: {resolution}")
-                candles = finnhub_client.stock_candles(ticker, resolution, start_timestamp, end_timestamp)
-                
-                if candles and candles.get('s') == 'ok':
-                    # Convert Unix timestamps to readable format
-                    timestamps = [datetime.fromtimestamp(t).strftime('%Y-%m-%d %H:%M:%S') for t in candles['t']]
-                    
-                    data = {
-                        'ticker': ticker,
-                        'interval': interval,
-                        'start_date': start_date.isoformat(),
-                        'end_date': end_date.isoformat(),
-                        'data': {
-                            'timestamp': timestamps,
-                            'open': candles['o'],
-                            'high': candles['h'],
-                            'low': candles['l'],
-                            'close': candles['c'],
-                            'volume': candles['v']
-                        }
-                    }
-                    
-                    print(f"DEBUG: Successfully fetched {len(timestamps)} data points from Finnhub")
-                    return jsonify(data)
-            except Exception as finnhub_error:
-                print(f"DEBUG: Finnhub failed, falling back to Yahoo Finance: {str(finnhub_error)}")
-        
-        # Fall back to Yahoo Finance for intraday data or if Finnhub fails
-        print(f"DEBUG: Using Yahoo Finance for {ticker}")
-        stock = yf.Ticker(ticker)
-        
-        # Calculate date range
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
-        
-        # Adjust interval for Yahoo Finance compatibility
-        yf_interval = interval
-        if interval == '1h':
-            yf_interval = '60m'
+        tickers = parse_tickers(request.args.get('tickers'))
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    
+    events, deliver = queue_delivery()
+    subscription = quote_hub.subscribe(tickers, deliver)
+    print(f"DEBUG: Quote stream opened for {', '.join(tickers)}")
+    
+    def generate():
+        try:
+            yield SSE_RETRY
+            while not subscription.closed:
+                try:
+                    event = events.get(timeout=QUOTE_STREAM_HEARTBEAT)
+                except queue.Empty:
+                    # Also how a closed connection is noticed: the write fails and the generator is closed
+                    yield SSE_KEEPALIVE
+                    continue
+                yield sse_event(event)
+        finally:
+            quote_hub.unsubscribe(subscription)
+            print(f"DEBUG: Quote stream closed for {', '.join(tickers)}")
+    
+    return Response(generate(), content_type='text/event-stream', headers=SSE_HEADERS)
+
+VALID_INTERVALS = ['1m', '5m', '15m', '30m', '1h', '1d', '1wk', '1mo']
+
+def validate_chart_params(interval, days, max_days=365):
+    """Return an error message if the chart interval/days combination is invalid"""
+    if interval not in VALID_INTERVALS:
+        return f"Invalid interval. Must be one of: {', '.join(VALID_INTERVALS)}"
+    if days < 1 or days > max_days:
+        return f"Days parameter must be between 1 and {max_days}"
+    return None
+
+def intraday_result(ticker, interval, days):
+    """Fetch price history for a chart through the shared cache, returning (payload, status_code)"""
+    key = (ticker.upper(), interval, days)
+    return intraday_cache.get_or_load(key, lambda: load_intraday(ticker, interval, days),
+                                      cacheable=lambda result: result[1] == 200)
+
+def chart_result(ticker, interval, days, max_points=None, since=None):
+    """Chart payload reduced to at most max_points bars, or only the bars from `since` on, returning (payload, status_code)"""
+    payload, status = intraday_result(ticker, interval, days)
+    if status != 200:
+        return payload, status
+    if since is not None:
+        delta = delta_payload(payload, since, max_points)
+        if delta is not None:
+            return delta, status
+    if not max_points or len(payload['data']) <= max_points:
+        return payload, status
+    from data.downsample import downsample_bars
+    
+    # The cached full-resolution payload is shared, so downsample into a copy
+    series = payload['data']
+    return dict(payload, data=wire.Series(downsample_bars(series.columns, max_points), series.tz),
+                total_points=len(series)), status
+
+def delta_payload(payload, since, max_points=None):
+    """Bars from the one stamped `since` (which may have been revised) onward, or None if a full payload is needed.
+
+    That is the case when `since` is no longer a bar of the window (the
+    window moved past it, or the client's series is from another range) or
+    when more bars than max_points have arrived since.
+    """
+    series = payload['data']
+    timestamps = series.columns['timestamp']
+    position = int(timestamps.searchsorted(since))
+    if position == len(timestamps) or timestamps[position] != since:
+        return None
+    if max_points and len(timestamps) - position > max_points:
+        return None
+    # Clients drop bars before first_timestamp, which have left the window
+    return dict(payload, data=wire.Series({name: values[position:] for name, values in series.columns.items()}, series.tz),
+                delta=True, since=since, first_timestamp=int(timestamps[0]))
+
+def indicators_result(ticker, interval, days, specs):
+    """Technical indicators for a chart range through the shared cache, returning (payload, status_code)"""
+    key = (ticker.upper(), interval, days, specs)
+    return indicators_cache.get_or_load(key, lambda: load_indicators(ticker, interval, days, specs),
+                                        cacheable=lambda result: result[1] == 200)
+
+def load_indicators(ticker, interval, days, specs):
+    """Update the range's indicator engine with its current bars and build the payload"""
+    from data.fetch_data import DAILY_INTERVALS
+    from data.indicators import IndicatorEngine
+    
+    payload, status = intraday_result(ticker, interval, days)
+    if status != 200:
+        return payload, status
+    series = payload['data']
+    try:
+        # The engine outlives the cached payloads, so a refresh only processes the bars added since
+        key = (ticker.upper(), interval, days, specs)
+        engine = indicator_engines.get_or_load(key, lambda: IndicatorEngine(specs, intraday=interval not in DAILY_INTERVALS))
+        columns = engine.update(series.columns, series.tz)
+    except Exception as e:
+        print(f"Error calculating indicators for {ticker}: {str(e)}")
+        return {"error": str(e)}, 500
+    
+    return {
+        'ticker': payload['ticker'],
+        'interval': interval,
+        'indicators': engine.names,
+        'data_source': payload['data_source'],
+        'last_updated': payload['last_updated'],
+        'timezone': payload['timezone'],
+        'data': wire.Series(columns, series.tz),
+    }, 200
+
+DATA_SOURCE_NAMES = {'finnhub': 'finnhub', 'yahoo': 'yahoo_finance', 'store': 'local_store'}
+
+def chart_window(interval, days):
+    """Providers and date range for a chart request, returning (sources, start_date, end_date)"""
+    from data.fetch_data import DAILY_INTERVALS
+    
+    # Calculate date range
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    
+    # Finnhub only serves daily candles on free keys; Yahoo Finance covers everything
+    if interval in DAILY_INTERVALS:
+        sources = ['finnhub', 'yahoo']
+    else:
+        sources = ['yahoo']
         
         # For 1-day requests with short intervals, ensure we get recent data
-        if days == 1 and interval in ['1m', '5m', '15m', '30m', '1h']:
+        if days == 1:
             # For current day intraday data, use a more recent start time
             start_date = end_date - timedelta(hours=8)  # Last 8 hours of trading
+    return sources, start_date, end_date
+
+def load_bars(ticker, interval, days):
+    """Fetch bars from Finnhub or Yahoo Finance, returning (df, data_source, start_date, end_date)"""
+    sources, start_date, end_date = chart_window(interval, days)
+    print(f"DEBUG: Requesting {ticker} - Start: {start_date}, End: {end_date}, Interval: {interval}, Sources: {sources}")
+    
+    # Fetch bars, reusing previously stored ones and hedging across providers
+    fetcher = get_fetcher()
+    df, source = fetcher.get_bars_hedged(ticker, interval, start_date, end_date, sources)
+    
+    if df.empty:
+        # Try with a longer period if no data found
+        start_date = end_date - timedelta(days=max(days, 5))
+        print(f"DEBUG: Retrying with extended period: {start_date}")
+        df, source = fetcher.get_bars_hedged(ticker, interval, start_date, end_date, sources)
+    
+    print(f"DEBUG: Successfully fetched {len(df)} data points from {source}")
+    return df, DATA_SOURCE_NAMES[source], start_date, end_date
+
+def cached_bars(ticker, interval, days):
+    """Base-interval bars shared by every chart interval derived from them"""
+    key = (ticker.upper(), interval, days)
+    try:
+        return bars_cache.get_or_load(key, lambda: load_bars(ticker, interval, days),
+                                      cacheable=lambda result: len(result[0]) > 0)
+    except (RateLimited, CircuitOpen) as e:
+        stale = bars_cache.get_stale(key)
+        if stale is None:
+            raise
+        print(f"DEBUG: Rate limited, serving stale bars for {ticker}: {str(e)}")
+        return stale
+
+def load_intraday(ticker, interval, days):
+    """Build the chart payload, deriving coarser intervals locally from cached base bars"""
+    from data.resample import base_interval, resample_bars
+    
+    try:
+        print(f"DEBUG: Fetching {ticker} data - Interval: {interval}, Days: {days}")
         
-        print(f"DEBUG: Yahoo Finance request - Start: {start_date}, End: {end_date}, Interval: {yf_interval}")
-        
-        # Fetch intraday data
-        df = stock.history(start=start_date, end=end_date, interval=yf_interval)
-        
-        if df.empty:
-            # Try with a longer period if no data found
-            start_date = end_date - timedelta(days=max(days, 5))
-            print(f"DEBUG: Retrying with extended period: {start_date}")
-            df = stock.history(start=start_date, end=end_date, interval=yf_interval)
+        base = base_interval(interval, days)
+        df, data_source, start_date, end_date = cached_bars(ticker, base, days)
             
         if df.empty:
-            return jsonify({"error": f"No intraday data available for {ticker} with {interval} interval"}), 404
+            return {"error": f"No intraday data available for {ticker} with {interval} interval"}, 404
+        
+        if base != interval:
+            print(f"DEBUG: Resampling {len(df)} {base} bars to {interval}")
+            df = resample_bars(df, interval)
             
-        # Convert DataFrame to dictionary with ISO format timestamps
+        # Columns stay NumPy arrays in the cache; each response encodes them in its requested format
         data_info = {
             'ticker': ticker,
             'interval': interval,
             'start_date': start_date.isoformat(),
             'end_date': end_date.isoformat(),
-            'data_source': 'yahoo_finance',
+            'data_source': data_source,
             'last_updated': datetime.now().isoformat(),
             'market_status': get_market_status(),
-            'data': {
-                'timestamp': df.index.strftime('%Y-%m-%d %H:%M:%S').tolist(),
-                'open': df['Open'].tolist(),
-                'high': df['High'].tolist(),
-                'low': df['Low'].tolist(),
-                'close': df['Close'].tolist(),
-                'volume': df['Volume'].tolist()
-            }
+            'timezone': str(df.index.tz) if df.index.tz is not None else 'UTC',
+            'data': wire.Series.from_frame(df[['open', 'high', 'low', 'close', 'volume']])
         }
         
-        print(f"DEBUG: Successfully fetched {len(df)} data points from Yahoo Finance")
-        return jsonify(data_info)
+        return data_info, 200
         
+    except (RateLimited, CircuitOpen) as e:
+        return upstream_error(e)
     except ValueError as ve:
         print(f"Validation error for {ticker}: {str(ve)}")
-        return jsonify({"error": str(ve)}), 400
+        return {"error": str(ve)}, 400
     except Exception as e:
         print(f"Error fetching intraday data for {ticker}: {str(e)}")
         if "Symbol may be delisted" in str(e):
-            return jsonify({"error": f"Symbol {ticker} may be delisted or invalid"}), 404
-        return jsonify({"error": str(e)}), 500
+            return {"error": f"Symbol {ticker} may be delisted or invalid"}, 404
+        return {"error": str(e)}, 500
 
-@main.route('/api/stock/predict/<ticker>', methods=['GET'])
-def predict_stock_price(ticker):
-    print(f"DEBUG: Prediction endpoint called for ticker: {ticker}")
+STREAM_FORMAT = 'ndjson'
+
+def parse_format(args, streaming=False):
+    """Read the format query parameter of a chart request"""
+    formats = wire.FORMATS + [STREAM_FORMAT] if streaming else wire.FORMATS
+    fmt = args.get('format', 'json')
+    if fmt not in formats:
+        raise ValueError(f"Invalid format. Must be one of: {', '.join(formats)}")
+    return fmt
+
+def parse_max_points(args):
+    """Read the optional max_points query parameter of a chart request"""
+    if 'max_points' not in args:
+        return None
+    max_points = int(args['max_points'])
+    if max_points < 3:
+        raise ValueError("max_points must be at least 3")
+    return max_points
+
+def encoded_response(payload, status, fmt, seconds=None):
+    """Encode a payload that may hold price series, gzipped when the client accepts it.
+
+    With seconds, a successful response carries Cache-Control and
+    validators (see validate), and becomes a 304 if the client already has it.
+    """
+    body, content_type = wire.encode(payload, fmt if status == 200 else 'json')
+    status, headers = validate(request.full_path, body, status, seconds, request.if_none_match)
+    if status == 304:
+        return Response(status=304, headers=headers)
+    body, encoding = wire.compress(body, request.headers.get('Accept-Encoding'))
+    return Response(body, status=status, content_type=content_type, headers={**headers, **encoding})
+
+def parse_since(args):
+    """Read the optional since cursor (epoch seconds of the client's last bar) of a chart request"""
+    if 'since' not in args:
+        return None
+    return int(args['since'])
+
+def parse_chart_args(args, max_days=365):
+    """Read and validate the interval/days query parameters of a chart request"""
+    interval = args.get('interval', '1h')  # Default to 1-hour intervals
+    days = int(args.get('days', '1'))  # Default to 1 day of data
+    error = validate_chart_params(interval, days, max_days)
+    if error:
+        raise ValueError(error)
+    return interval, days
+
+def stream_bars(ticker, interval, days):
+    """Sync the bar store, then return a generator of NDJSON lines for the whole range.
+
+    The first line is the chart metadata, followed by columnar blocks of at
+    most STREAM_CHUNK_ROWS bars with epoch-second timestamps, read chunk by
+    chunk from the memory-mapped store. Bars are streamed at the requested
+    interval as stored, without resampling or downsampling. Provider errors
+    are raised before the first line so they still get a proper status code.
+    """
+    from data.fetch_data import empty_bars
+    
+    ticker = ticker.upper()
+    fetcher = get_fetcher()
+    sources, start_date, end_date = chart_window(interval, days)
+    try:
+        forming, source = fetcher.sync_bars(ticker, interval, start_date, end_date, sources)
+    except (RateLimited, CircuitOpen):
+        if not fetcher.store.info(ticker, interval)['rows']:
+            raise
+        print(f"DEBUG: Providers unavailable, streaming stored bars for {ticker}")
+        forming, source = empty_bars(), 'store'
+    
+    def generate():
+        meta = fetcher.store.info(ticker, interval)
+        yield wire.dumps({
+            'ticker': ticker,
+            'interval': interval,
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'data_source': DATA_SOURCE_NAMES[source],
+            'timezone': meta['tz'] or (str(forming.index.tz) if forming.index.tz is not None else 'UTC'),
+        }) + b'\n'
+        last = None
+        for chunk in fetcher.store.iter_chunks(ticker, interval, int(start_date.timestamp()),
+                                               int(end_date.timestamp()), rows=STREAM_CHUNK_ROWS):
+            last = chunk['timestamp'][-1]
+            yield wire.dumps(chunk) + b'\n'
+        if len(forming):
+            columns = wire.Series.from_frame(forming).columns
+            if last is not None:
+                keep = columns['timestamp'] > last
+                columns = {name: values[keep] for name, values in columns.items()}
+            if len(columns['timestamp']):
+                yield wire.dumps(columns) + b'\n'
+    
+    return generate()
+
+@main.route('/api/stock/intraday/<ticker>', methods=['GET'])
+def get_intraday_data(ticker):
+    cached = not_modified()
+    if cached:
+        return cached
+    
+    try:
+        fmt = parse_format(request.args, streaming=True)
+        interval, days = parse_chart_args(request.args, STREAM_MAX_DAYS if fmt == STREAM_FORMAT else 365)
+        max_points = parse_max_points(request.args)
+        since = parse_since(request.args)
+        if since is not None and fmt == STREAM_FORMAT:
+            raise ValueError("since is not supported with format=ndjson")
+    except ValueError as ve:
+        print(f"Validation error for {ticker}: {str(ve)}")
+        return jsonify({"error": str(ve)}), 400
+    
+    if fmt == STREAM_FORMAT:
+        try:
+            lines = stream_bars(ticker, interval, days)
+        except Exception as e:
+            print(f"Error streaming data for {ticker}: {str(e)}")
+            payload, status = upstream_error(e)
+            return jsonify(payload), status
+        return Response(lines, content_type='application/x-ndjson')
+    
+    payload, status = chart_result(ticker, interval, days, max_points, since)
+    return encoded_response(payload, status, fmt, max_age('chart'))
+
+@main.route('/api/stock/indicators/<ticker>', methods=['GET'])
+def get_indicators(ticker):
+    from data.indicators import parse_specs
+    
+    cached = not_modified()
+    if cached:
+        return cached
+    
+    try:
+        interval, days = parse_chart_args(request.args)
+        specs = parse_specs(request.args.get('indicators'))
+        fmt = parse_format(request.args)
+    except ValueError as ve:
+        print(f"Validation error for {ticker}: {str(ve)}")
+        return jsonify({"error": str(ve)}), 400
+    
+    payload, status = indicators_result(ticker, interval, days, specs)
+    return encoded_response(payload, status, fmt, max_age('chart'))
+
+def parse_chart_overrides(raw):
+    """Parse per-ticker chart settings of the form AAPL:5m:5,MSFT:1d:30, optionally with a since cursor (AAPL:5m:5:1718900000)"""
+    overrides = {}
+    for spec in (raw or '').split(','):
+        if not spec.strip():
+            continue
+        parts = spec.strip().split(':')
+        if len(parts) not in (3, 4):
+            raise ValueError(f"Invalid chart spec '{spec}'. Expected TICKER:INTERVAL:DAYS[:SINCE]")
+        overrides[parts[0].upper()] = (parts[1], int(parts[2]), int(parts[3]) if len(parts) == 4 else None)
+    return overrides
+
+def parse_portfolio_args(args):
+    """Read the tickers and per-ticker (interval, days, since) chart settings of a portfolio request"""
+    tickers = parse_tickers(args.get('tickers'))
+    interval = args.get('interval', '1h')
+    days = int(args.get('days', '1'))
+    charts = parse_chart_overrides(args.get('charts'))
+    
+    chart_params = {ticker: charts.get(ticker, (interval, days, None)) for ticker in tickers}
+    for ticker, (chart_interval, chart_days, _) in chart_params.items():
+        error = validate_chart_params(chart_interval, chart_days)
+        if error:
+            raise ValueError(f"{ticker}: {error}")
+    return tickers, chart_params
+
+PORTFOLIO_PARTS = ['profile', 'quote', 'intraday']
+
+def parse_portfolio_parts(args):
+    """Read which card parts a portfolio request wants, e.g. parts=quote,intraday when profiles are cached"""
+    parts = [part.strip() for part in args.get('parts', ','.join(PORTFOLIO_PARTS)).split(',') if part.strip()]
+    invalid = [part for part in parts if part not in PORTFOLIO_PARTS]
+    if invalid or not parts:
+        raise ValueError(f"Invalid parts. Must be a comma-separated subset of: {', '.join(PORTFOLIO_PARTS)}")
+    return parts
+
+def portfolio_payload(results):
+    """Group ((ticker, part), (payload, status_code)) results into one card per ticker"""
+    cards = {}
+    for (ticker, part), (payload, status) in results:
+        card = cards.setdefault(ticker, {'profile': None, 'quote': None, 'intraday': None, 'errors': {}})
+        if status == 200:
+            card[part] = payload
+        else:
+            card['errors'][part] = payload['error']
+    return {'cards': cards}
+
+def portfolio_max_age(parts, payload):
+    """A portfolio is only as fresh as its most volatile part; one with failed lookups is not cached"""
+    if any(card['errors'] for card in payload['cards'].values()):
+        return None
+    return min(max_age('chart' if part == 'intraday' else part) for part in parts)
+
+@main.route('/api/stock/portfolio', methods=['GET'])
+def get_portfolio():
+    """Profile, quote and chart data for every ticker in a portfolio in one response"""
+    cached = not_modified()
+    if cached:
+        return cached
+    
+    try:
+        tickers, chart_params = parse_portfolio_args(request.args)
+        parts = parse_portfolio_parts(request.args)
+        fmt = parse_format(request.args)
+        max_points = parse_max_points(request.args)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    
+    # Run every lookup concurrently; the caches coalesce duplicate work across requests
+    futures = {}
+    for ticker in tickers:
+        if 'profile' in parts:
+            futures[(ticker, 'profile')] = upstream_pool.submit(profile_result, ticker)
+        if 'quote' in parts:
+            futures[(ticker, 'quote')] = upstream_pool.submit(quote_result, ticker)
+        if 'intraday' in parts:
+            interval, days, since = chart_params[ticker]
+            futures[(ticker, 'intraday')] = upstream_pool.submit(chart_result, ticker, interval, days, max_points, since)
+    
+    payload = portfolio_payload((key, future.result()) for key, future in futures.items())
+    return encoded_response(payload, 200, fmt, portfolio_max_age(parts, payload))
+
+def prediction_inputs(ticker):
+    """Daily history the model is trained on, the closes to predict from (with today's live close) and the data source"""
+    import pandas as pd
+    from models.registry import SEQUENCE_LENGTH
+    
+    # Hedge Finnhub with Yahoo Finance so a slow Finnhub failure doesn't delay training
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=5*365)
+    df, source = get_fetcher().get_bars_hedged(ticker, '1d', start_date, end_date, ['finnhub', 'yahoo'],
+                                         priority=PRIORITY_HISTORY, min_rows=SEQUENCE_LENGTH)
+    print(f"DEBUG: Fetched {len(df)} rows from {source}")
+    
+    if df is None or len(df) < SEQUENCE_LENGTH:
+        raise ValueError(f'Not enough data for prediction from either Finnhub or Yahoo Finance. Need {SEQUENCE_LENGTH} days, got {len(df) if df is not None else 0}')
+    
+    # The model is trained on completed daily bars only; today's bar is still forming and would be
+    # recorded as the registry's last bar, so the live close is just a prediction input
+    today = datetime.now(MARKET_TZ).date()
+    history = df[df.index.date < today]
+    
+    print(f"DEBUG: Fetching live quote for {ticker}")
+    # Fetch the latest live price and append to df if not already present
+    quote = fetch_quote(ticker)
+    live_close = quote.get('c')
+    if live_close and df.index[-1].date() < today:
+        print(f"DEBUG: Appending live data: {live_close}")
+        # Append a new row for today with the live close
+        new_row = pd.DataFrame({
+            'open': [quote.get('o', live_close)],
+            'high': [quote.get('h', live_close)],
+            'low': [quote.get('l', live_close)],
+            'close': [live_close],
+            'volume': [quote.get('v', 0)]
+        }, index=[pd.Timestamp(today)])
+        df = pd.concat([df, new_row])
+    return history, df, source
+
+def prediction_payload(df, next_price, source):
+    import pandas as pd
+    # Predicted close is for the day after the latest date
+    next_date = (df.index[-1] + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+    return {'date': next_date, 'predicted_close': float(next_price), 'data_source': DATA_SOURCE_NAMES[source]}
+
+def predict_result(ticker):
+    """Predict the next close with the ticker's model, returning (payload, status_code)"""
+    from models.registry import registry
+    
     try:
         print(f"DEBUG: Starting prediction process for {ticker}")
-        # Try Finnhub first
-        df = fetcher.fetch_historical_data(ticker, days=5*365)
-        print(f"DEBUG: Fetched {len(df) if df is not None else 0} rows from Finnhub")
-        
-        # If not enough data, try Yahoo Finance
-        if df is None or len(df) < predictor.sequence_length:
-            print(f"DEBUG: Not enough data from Finnhub, trying Yahoo Finance")
-            stock = yf.Ticker(ticker)
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=5*365)
-            ydf = stock.history(start=start_date, end=end_date, interval='1d')
-            if not ydf.empty:
-                ydf = ydf.rename(columns={
-                    'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close', 'Volume': 'volume'
-                })
-                ydf = ydf[['open', 'high', 'low', 'close', 'volume']]
-                ydf.index.name = 'timestamp'
-                df = ydf
-                print(f"DEBUG: Fetched {len(df)} rows from Yahoo Finance")
-        
-        if df is None or len(df) < predictor.sequence_length:
-            error_msg = f'Not enough data for prediction from either Finnhub or Yahoo Finance. Need {predictor.sequence_length} days, got {len(df) if df is not None else 0}'
-            print(f"DEBUG: {error_msg}")
-            return jsonify({'error': error_msg}), 400
-        
-        print(f"DEBUG: Fetching live quote for {ticker}")
-        # Fetch the latest live price and append to df if not already present
-        quote = finnhub_client.quote(ticker)
-        live_close = quote.get('c')
-        if live_close and (df.index[-1].date() < datetime.now().date()):
-            print(f"DEBUG: Appending live data: {live_close}")
-            # Append a new row for today with the live close
-            new_row = pd.DataFrame({
-                'open': [quote.get('o', live_close)],
-                'high': [quote.get('h', live_close)],
-                'low': [quote.get('l', live_close)],
-                'close': [live_close],
-                'volume': [quote.get('v', 0)]
-            }, index=[pd.Timestamp(datetime.now().date())])
-            df = pd.concat([df, new_row])
-        
-        print(f"DEBUG: Training model with {len(df)} data points")
-        # Train the model
-        predictor.train(df, epochs=10, batch_size=16)
+        history, df, source = prediction_inputs(ticker)
         
         print(f"DEBUG: Making prediction")
-        # Predict the next closing price (for the day after the latest date)
-        next_price = predictor.predict(df['close'].values)
-        last_date = df.index[-1]
-        next_date = (last_date + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+        # A saved model that has seen every bar runs here in NumPy, batched with concurrent requests;
+        # otherwise a model worker process fine-tunes or trains it
+        engine = registry.engine(ticker, history.index[-1])
+        if engine is not None:
+            next_price = inference_batcher.predict(engine, df['close'].values)
+        else:
+            next_price = model_pool.call('predict', ticker, history, df['close'].values)
         
-        result = {'date': next_date, 'predicted_close': float(next_price)}
+        result = prediction_payload(df, next_price, source)
         print(f"DEBUG: Prediction successful: {result}")
-        return jsonify(result)
+        return result, 200
+    except ValueError as ve:
+        print(f"DEBUG: {ve}")
+        return {'error': str(ve)}, 400
+    except (RateLimited, CircuitOpen) as e:
+        return upstream_error(e)
     except Exception as e:
         error_msg = str(e)
         print(f"DEBUG: Prediction failed with error: {error_msg}")
-        return jsonify({'error': error_msg}), 500
+        return {'error': error_msg}, 500
+
+# Training runs in separate processes rather than in request handlers; one job per ticker at a time
+model_pool = ModelWorkerPool(workers=PREDICT_WORKERS, max_rss_mb=PREDICT_WORKER_MAX_RSS_MB)
+inference_batcher = MicroBatcher(window=PREDICT_BATCH_WINDOW_MS / 1000, max_batch=PREDICT_BATCH_MAX)
+# Every admitted job gets a thread: jobs that need training queue for a model worker, while jobs
+# with an up-to-date model run concurrently and meet in the batcher
+prediction_jobs = JobQueue(predict_result, workers=max(PREDICT_WORKERS, PREDICT_MAX_QUEUE),
+                           retention=PREDICT_JOB_RETENTION, max_pending=PREDICT_MAX_QUEUE, name='predict')
+
+def submit_prediction(ticker):
+    """Queue (or join) the prediction job for a ticker, returning (payload, status_code)"""
+    ticker = ticker.upper()
+    try:
+        job = prediction_jobs.submit(ticker, ticker)
+    except JobQueueFull as e:
+        return {'error': str(e)}, 503
+    job['status_url'] = f"/api/stock/predict/jobs/{job['job_id']}"
+    return job, 202
+
+def batch_inputs(ticker):
+    try:
+        return prediction_inputs(ticker), None
+    except ValueError as ve:
+        return None, ({'error': str(ve)}, 400)
+    except (RateLimited, CircuitOpen) as e:
+        return None, upstream_error(e)
+    except Exception as e:
+        print(f"DEBUG: Prediction inputs for {ticker} failed: {str(e)}")
+        return None, ({'error': str(e)}, 500)
+
+def batch_predictions(tickers, results):
+    """Predict several tickers from their batch_inputs results, returning (payload, status_code).
+
+    Tickers whose saved model is up to date are predicted inline in a single
+    forward pass; the rest get a prediction job to poll, as for one ticker.
+    """
+    from models.numpy_lstm import predict_many
+    from models.registry import registry
+    
+    predictions, jobs, errors = {}, {}, {}
+    ready = []
+    for ticker, (inputs, error) in zip(tickers, results):
+        if error is not None:
+            errors[ticker] = error[0]['error']
+            continue
+        history, df, source = inputs
+        engine = registry.engine(ticker, history.index[-1])
+        if engine is not None:
+            ready.append((ticker, engine, df, source))
+            continue
+        payload, status = submit_prediction(ticker)
+        if status == 202:
+            jobs[ticker] = payload
+        else:
+            errors[ticker] = payload['error']
+    
+    if ready:
+        try:
+            prices = predict_many([engine for _, engine, _, _ in ready], [df['close'].values for _, _, df, _ in ready])
+        except Exception as e:
+            print(f"DEBUG: Batched prediction failed with error: {str(e)}")
+            return {'error': str(e)}, 500
+        for (ticker, _, df, source), price in zip(ready, prices):
+            predictions[ticker] = prediction_payload(df, price, source)
+    print(f"DEBUG: Batch prediction: {len(predictions)} inline, {len(jobs)} queued, {len(errors)} failed")
+    return {'predictions': predictions, 'jobs': jobs, 'errors': errors}, 200
+
+def prediction_job(job_id):
+    """State of a prediction job, returning (payload, status_code)"""
+    job = prediction_jobs.get(job_id)
+    if job is None:
+        return {'error': f'Unknown or expired prediction job {job_id}'}, 404
+    return job, 200
+
+@main.route('/api/stock/predict', methods=['GET'])
+def predict_stock_prices():
+    try:
+        tickers = parse_tickers(request.args.get('tickers'))
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    payload, status = batch_predictions(tickers, upstream_pool.map(batch_inputs, tickers))
+    return jsonify(payload), status
+
+@main.route('/api/stock/predict/<ticker>', methods=['GET', 'POST'])
+def predict_stock_price(ticker):
+    print(f"DEBUG: Prediction endpoint called for ticker: {ticker}")
+    payload, status = submit_prediction(ticker)
+    return jsonify(payload), status
+
+@main.route('/api/stock/predict/jobs/<job_id>', methods=['GET'])
+def get_prediction_job(job_id):
+    payload, status = prediction_job(job_id)
+    return jsonify(payload), status
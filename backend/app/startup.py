@@ -0,0 +1,84 @@
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+
+
+class ImportTimer:
+    """Records how long each module takes to import while active.
+
+    Wraps builtins.__import__, so every import statement for a module not yet
+    in sys.modules is timed. Times are inclusive: a module's entry also covers
+    the modules it imports itself, as with `python -X importtime`.
+    """
+
+    def __init__(self):
+        self.times = {}  # module -> seconds
+        self.started = None
+        self.elapsed = None
+        self._original = None
+
+    def start(self):
+        """Begin timing imports; returns False if the timer has already been started once"""
+        if self.started is not None:
+            return False
+        self.started = time.perf_counter()
+        self._original = builtins.__import__
+        original, times = self._original, self.times
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            module = name
+            if level:
+                try:
+                    module = importlib.util.resolve_name('.' * level + name, (globals or {}).get('__package__'))
+                except (ImportError, ValueError):
+                    pass
+            if module in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            started = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                times.setdefault(module, time.perf_counter() - started)
+
+        builtins.__import__ = timed_import
+        return True
+
+    def stop(self):
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+            self.elapsed = time.perf_counter() - self.started
+
+    def slowest(self, count=15):
+        return sorted(self.times.items(), key=lambda item: item[1], reverse=True)[:count]
+
+
+import_timer = ImportTimer()
+
+# Heavy modules loaded after startup, on first use: name -> seconds
+_lazy_loads = {}
+_lazy_lock = threading.Lock()
+
+
+def record_lazy_load(name, seconds):
+    with _lazy_lock:
+        _lazy_loads[name] = seconds
+    print(f"DEBUG: Loaded {name} on first use in {seconds:.2f}s")
+
+
+def report():
+    """Startup time, slowest imports during startup and modules loaded lazily since"""
+    with _lazy_lock:
+        lazy = dict(_lazy_loads)
+    return {
+        'startup_seconds': round(import_timer.elapsed, 3) if import_timer.elapsed is not None else None,
+        'imports': [{'module': name, 'seconds': round(seconds, 3)} for name, seconds in import_timer.slowest()],
+        'lazy_loads': {name: round(seconds, 3) for name, seconds in lazy.items()},
+    }
+
+
+def print_report():
+    slowest = ', '.join(f"{name} {seconds:.2f}s" for name, seconds in import_timer.slowest(8))
+    print(f"DEBUG: App ready in {import_timer.elapsed:.2f}s; slowest imports: {slowest}")
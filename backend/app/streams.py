@@ -0,0 +1,157 @@
+import asyncio
+import queue
+import threading
+import time
+
+
+class Subscription:
+    """One client's interest in a set of tickers; events are handed to deliver(event).
+
+    deliver must not block. It returns False once the client can't keep up
+    or has gone away, and the hub then drops the subscription.
+    """
+
+    def __init__(self, tickers, deliver):
+        self.tickers = tickers
+        self.deliver = deliver
+        self.closed = False
+
+
+def queue_delivery(maxsize=256):
+    """A bounded queue and a deliver function that feeds it, for thread-based consumers"""
+    events = queue.Queue(maxsize=maxsize)
+
+    def deliver(event):
+        try:
+            events.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+
+    return events, deliver
+
+
+def async_queue_delivery(loop, maxsize=256):
+    """An asyncio.Queue on loop and a deliver function that feeds it from other threads"""
+    events = asyncio.Queue()
+
+    def deliver(event):
+        if events.qsize() >= maxsize:
+            return False
+        try:
+            loop.call_soon_threadsafe(events.put_nowait, event)
+        except RuntimeError:  # the event loop has shut down
+            return False
+        return True
+
+    return events, deliver
+
+
+class QuoteHub:
+    """Polls each subscribed ticker once per interval and fans changes out to every subscriber.
+
+    fetch_many(tickers) returns a (payload, status_code) per ticker, as the
+    quote endpoints do. Upstream calls therefore scale with the number of
+    distinct tickers being watched, not with the number of clients. A new
+    subscriber first gets a 'snapshot' event per ticker with the last known
+    quote; after that, 'quote' events carry only the fields that changed and
+    'error' events are sent when a ticker's fetch starts failing. The poller
+    thread starts with the first subscription and idles while there are none.
+    """
+
+    def __init__(self, fetch_many, interval=15):
+        self.fetch_many = fetch_many
+        self.interval = interval
+        self._subscribers = {}  # ticker -> set of subscriptions
+        self._last = {}  # ticker -> last quote sent
+        self._failing = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._thread = None
+
+    def subscribe(self, tickers, deliver):
+        sub = Subscription(tickers, deliver)
+        with self._lock:
+            for ticker in tickers:
+                self._subscribers.setdefault(ticker, set()).add(sub)
+                if ticker in self._last:
+                    self._send(sub, {'event': 'snapshot', 'ticker': ticker, 'quote': dict(self._last[ticker])})
+                elif ticker in self._failing:
+                    self._send(sub, {'event': 'error', 'ticker': ticker, 'error': 'Quote unavailable, retrying'})
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='quote-hub', daemon=True)
+                self._thread.start()
+            self._wake.notify()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._remove(sub)
+
+    def _remove(self, sub):
+        sub.closed = True
+        for ticker in sub.tickers:
+            subscribers = self._subscribers.get(ticker)
+            if subscribers is None:
+                continue
+            subscribers.discard(sub)
+            if not subscribers:
+                # Nobody is watching any more; a later subscriber waits for the next poll
+                del self._subscribers[ticker]
+                self._last.pop(ticker, None)
+                self._failing.discard(ticker)
+
+    def _send(self, sub, event):
+        if not sub.closed and not sub.deliver(event):
+            print(f"DEBUG: Dropping slow quote stream subscriber for {', '.join(sub.tickers)}")
+            self._remove(sub)
+
+    def _publish(self, ticker, event):
+        for sub in list(self._subscribers.get(ticker, ())):
+            self._send(sub, event)
+
+    def status(self):
+        with self._lock:
+            return {
+                'tickers': len(self._subscribers),
+                'subscribers': len({sub for subs in self._subscribers.values() for sub in subs}),
+                'interval': self.interval,
+            }
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._subscribers:
+                    self._wake.wait()
+                tickers = list(self._subscribers)
+            started = time.monotonic()
+            try:
+                results = self.fetch_many(tickers)
+            except Exception as e:
+                print(f"Error polling quotes for stream: {str(e)}")
+                results = [({'error': str(e)}, 500)] * len(tickers)
+            with self._lock:
+                for ticker, (payload, status) in zip(tickers, results):
+                    if ticker not in self._subscribers:
+                        continue
+                    if status != 200:
+                        if ticker not in self._failing:
+                            self._failing.add(ticker)
+                            self._publish(ticker, {'event': 'error', 'ticker': ticker, 'error': payload.get('error')})
+                        continue
+                    self._failing.discard(ticker)
+                    last = self._last.get(ticker)
+                    if last is None:
+                        self._last[ticker] = dict(payload)
+                        self._publish(ticker, {'event': 'snapshot', 'ticker': ticker, 'quote': dict(payload)})
+                        continue
+                    changes = {key: value for key, value in payload.items() if last.get(key) != value}
+                    if changes:
+                        last.update(changes)
+                        self._publish(ticker, {'event': 'quote', 'ticker': ticker, 'changes': changes})
+                # Sleep out the rest of the interval, waking early for new tickers
+                while self._subscribers and time.monotonic() - started < self.interval:
+                    known = set(tickers)
+                    if any(ticker not in known for ticker in self._subscribers):
+                        break
+                    self._wake.wait(self.interval - (time.monotonic() - started))
@@ -0,0 +1,114 @@
+import gzip
+import json
+import struct
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+
+FORMATS = ['json', 'epoch', 'binary']
+
+BINARY_CONTENT_TYPE = 'application/x-stock-columns'
+GZIP_MIN_BYTES = 1024
+
+
+class Series:
+    """Price bars held as NumPy columns until the response format is known.
+
+    Timestamps are int64 epoch seconds (UTC); tz is the exchange timezone the
+    'json' format renders wall-clock strings in.
+    """
+
+    def __init__(self, columns, tz=None):
+        self.columns = columns
+        self.tz = tz
+
+    @classmethod
+    def from_frame(cls, df):
+        index = df.index
+        tz = str(index.tz) if index.tz is not None else None
+        if tz:
+            index = index.tz_convert('UTC').tz_localize(None)
+        columns = {'timestamp': index.as_unit('s').asi8.astype('<i8')}
+        for col in df.columns:
+            columns[col] = np.ascontiguousarray(df[col].to_numpy(dtype='<f8'))
+        return cls(columns, tz)
+
+    def __len__(self):
+        return len(self.columns['timestamp'])
+
+    def formatted_timestamps(self):
+        import pandas as pd
+        index = pd.to_datetime(self.columns['timestamp'], unit='s')
+        if self.tz:
+            index = index.tz_localize('UTC').tz_convert(self.tz)
+        return index.strftime('%Y-%m-%d %H:%M:%S').tolist()
+
+
+def _prepare(obj, fmt, buffers):
+    """Replace Series in a payload with what the format sends in the JSON part"""
+    if isinstance(obj, dict):
+        return {key: _prepare(value, fmt, buffers) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_prepare(value, fmt, buffers) for value in obj]
+    if not isinstance(obj, Series):
+        return obj
+
+    if fmt == 'json':
+        # Original layout: formatted wall-clock strings and plain lists
+        data = {'timestamp': obj.formatted_timestamps()}
+        data.update({name: values for name, values in obj.columns.items() if name != 'timestamp'})
+        return data
+    if fmt == 'epoch':
+        return dict(obj.columns)
+
+    # binary: columns are referenced by offset into the buffer following the header
+    data = {}
+    for name, values in obj.columns.items():
+        offset = sum(len(buf) for buf in buffers)
+        buffers.append(values.tobytes())
+        data[name] = {'dtype': values.dtype.str, 'offset': offset, 'length': len(values)}
+    return data
+
+
+def _default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Serialize to JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode()
+
+
+def encode(payload, fmt='json'):
+    """Encode a payload for the wire, returning (body, content_type).
+
+    'json' keeps the original string timestamps, 'epoch' sends integer epoch
+    seconds, and 'binary' sends a little-endian uint32 header length, a JSON
+    header, then the raw column arrays the header points into.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Invalid format. Must be one of: {', '.join(FORMATS)}")
+    buffers = []
+    header = dumps(_prepare(payload, fmt, buffers))
+    if fmt != 'binary':
+        return header, 'application/json'
+    # Pad so the columns start 8-byte aligned and can be viewed in place
+    header += b' ' * (-(4 + len(header)) % 8)
+    return struct.pack('<I', len(header)) + header + b''.join(buffers), BINARY_CONTENT_TYPE
+
+
+def compress(body, accept_encoding):
+    """Gzip a response body when the client accepts it, returning (body, headers)"""
+    if len(body) < GZIP_MIN_BYTES or 'gzip' not in (accept_encoding or ''):
+        return body, {'Vary': 'Accept-Encoding'}
+    return gzip.compress(body, compresslevel=5), {'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'}
@@ -0,0 +1,171 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class BarStore:
+    """Append-only on-disk OHLCV store with one directory per ticker and interval.
+
+    Every column lives in its own raw file (timestamps as int64 epoch seconds,
+    prices and volume as float64) so reads can memory-map them directly.
+    meta.json holds the committed row count and is only rewritten after all
+    column files are flushed, so a partially written append is never visible
+    and is truncated away by the next writer.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _dir(self, ticker, interval):
+        return os.path.join(self.root, ticker.upper(), interval)
+
+    @contextmanager
+    def _locked(self, path, exclusive):
+        with self._locks_guard:
+            thread_lock = self._locks.setdefault(path, threading.RLock())
+        with thread_lock:
+            if fcntl is None or not (exclusive or os.path.isdir(path)):
+                yield
+                return
+            os.makedirs(path, exist_ok=True)
+            with open(os.path.join(path, '.lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_meta(self, path):
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {'rows': 0, 'start': None, 'last': None, 'tz': None}
+
+    def _write_meta(self, path, meta):
+        tmp = os.path.join(path, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(path, 'meta.json'))
+
+    @staticmethod
+    def _to_arrays(df):
+        index = df.index
+        if index.tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        arrays = {'timestamp': index.as_unit('s').asi8.astype('<i8')}
+        for col in COLUMNS:
+            arrays[col] = df[col].to_numpy(dtype='<f8')
+        return arrays
+
+    def info(self, ticker, interval):
+        """Committed row count, covered start (epoch seconds), last bar and timezone"""
+        path = self._dir(ticker, interval)
+        with self._locked(path, exclusive=False):
+            return self._read_meta(path)
+
+    def columns(self, ticker, interval):
+        """Read-only memory-mapped column arrays for the committed rows"""
+        path = self._dir(ticker, interval)
+        with self._locked(path, exclusive=False):
+            meta = self._read_meta(path)
+            rows = meta['rows']
+            if rows == 0:
+                empty = {'timestamp': np.empty(0, dtype='<i8')}
+                empty.update({col: np.empty(0, dtype='<f8') for col in COLUMNS})
+                return empty, meta
+            arrays = {'timestamp': np.memmap(os.path.join(path, 'timestamp.i8'), dtype='<i8', mode='r', shape=(rows,))}
+            for col in COLUMNS:
+                arrays[col] = np.memmap(os.path.join(path, f'{col}.f8'), dtype='<f8', mode='r', shape=(rows,))
+            return arrays, meta
+
+    def read(self, ticker, interval, start=None, end=None):
+        """Bars between start and end (epoch seconds, inclusive) as a DataFrame"""
+        arrays, meta = self.columns(ticker, interval)
+        timestamps = arrays['timestamp']
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+        return frame_from_arrays({name: values[lo:hi] for name, values in arrays.items()}, meta['tz'])
+
+    def iter_chunks(self, ticker, interval, start=None, end=None, rows=5000):
+        """Yield the bars between start and end as column dicts of at most `rows` bars.
+
+        Chunks are slices of the memory-mapped columns, so only the chunk being
+        consumed is paged in regardless of how long the window is.
+        """
+        arrays, _ = self.columns(ticker, interval)
+        timestamps = arrays['timestamp']
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+        for offset in range(lo, hi, rows):
+            yield {name: np.asarray(values[offset:min(offset + rows, hi)]) for name, values in arrays.items()}
+
+    def append(self, ticker, interval, df):
+        """Append bars newer than the last stored one; older or duplicate bars are ignored"""
+        path = self._dir(ticker, interval)
+        with self._locked(path, exclusive=True):
+            meta = self._read_meta(path)
+            if meta['rows'] == 0:
+                raise ValueError(f"No stored bars for {ticker} {interval}; use replace() first")
+            arrays = self._to_arrays(df)
+            keep = arrays['timestamp'] > meta['last']
+            if not keep.any():
+                return 0
+            for name, values in arrays.items():
+                filename = 'timestamp.i8' if name == 'timestamp' else f'{name}.f8'
+                with open(os.path.join(path, filename), 'r+b') as f:
+                    # Drop anything past the committed rows left by an interrupted append
+                    f.truncate(meta['rows'] * 8)
+                    f.seek(0, os.SEEK_END)
+                    f.write(values[keep].tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+            meta['rows'] += int(keep.sum())
+            meta['last'] = int(arrays['timestamp'][keep][-1])
+            self._write_meta(path, meta)
+            return int(keep.sum())
+
+    def replace(self, ticker, interval, df, start):
+        """Rewrite the stored bars, recording that data is complete from start onwards"""
+        path = self._dir(ticker, interval)
+        os.makedirs(path, exist_ok=True)
+        with self._locked(path, exclusive=True):
+            arrays = self._to_arrays(df.sort_index())
+            for name, values in arrays.items():
+                filename = 'timestamp.i8' if name == 'timestamp' else f'{name}.f8'
+                tmp = os.path.join(path, filename + '.tmp')
+                with open(tmp, 'wb') as f:
+                    f.write(values.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, os.path.join(path, filename))
+            self._write_meta(path, {
+                'rows': len(df),
+                'start': int(start),
+                'last': int(arrays['timestamp'][-1]) if len(df) else None,
+                'tz': str(df.index.tz) if df.index.tz is not None else None,
+            })
+
+
+def frame_from_arrays(arrays, tz=None):
+    """Build an OHLCV DataFrame from timestamp/column arrays read from the store"""
+    index = pd.to_datetime(np.asarray(arrays['timestamp']), unit='s')
+    if tz:
+        index = index.tz_localize('UTC').tz_convert(tz)
+    index.name = 'timestamp'
+    return pd.DataFrame({col: np.asarray(arrays[col]) for col in COLUMNS}, index=index)
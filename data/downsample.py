@@ -0,0 +1,67 @@
+import numpy as np
+
+
+def _bucket_edges(length, buckets):
+    """Start offsets of `buckets` nearly equal runs over `length` bars, plus the end"""
+    return np.linspace(0, length, buckets + 1).astype(np.int64)
+
+
+def lttb_indices(y, buckets):
+    """Index of the most visually significant point in each bucket (Largest-Triangle-Three-Buckets).
+
+    x is the bar position, matching the chart's category axis, so overnight
+    and weekend gaps don't count as distance. The first and last buckets keep
+    their first and last point. Classic LTTB anchors each triangle on the
+    point picked in the previous bucket, which makes it sequential; here the
+    previous bucket's average is used instead so every bucket is scored in one
+    vectorized pass.
+    """
+    length = len(y)
+    edges = _bucket_edges(length, buckets)
+    starts, counts = edges[:-1], np.diff(edges)
+    x = np.arange(length, dtype='float64')
+    bucket = np.repeat(np.arange(buckets), counts)
+
+    mean_x = np.add.reduceat(x, starts) / counts
+    mean_y = np.add.reduceat(y, starts) / counts
+    prev = np.maximum(bucket - 1, 0)
+    nxt = np.minimum(bucket + 1, buckets - 1)
+
+    # Twice the triangle area between previous average, candidate and next average
+    area = np.abs(
+        (mean_x[prev] - mean_x[nxt]) * (y - mean_y[prev])
+        - (mean_x[prev] - x) * (mean_y[nxt] - mean_y[prev])
+    )
+    area = np.nan_to_num(area, nan=-1.0)
+
+    # First position in each bucket that reaches the bucket's largest area
+    best = np.maximum.reduceat(area, starts)
+    hits = np.flatnonzero(area == best[bucket])
+    _, first = np.unique(bucket[hits], return_index=True)
+    picked = hits[first]
+    picked[0], picked[-1] = 0, length - 1
+    return picked
+
+
+def downsample_bars(columns, max_points):
+    """Reduce OHLCV columns to at most max_points bars that keep the chart's shape.
+
+    Each output bar covers a run of consecutive source bars: timestamp and
+    close come from the LTTB pick, open is the run's first open, high/low are
+    the run's envelope and volume is summed.
+    """
+    length = len(columns['timestamp'])
+    if max_points >= length:
+        return columns
+    edges = _bucket_edges(length, max_points)
+    starts = edges[:-1]
+    picked = lttb_indices(np.asarray(columns['close'], dtype='float64'), max_points)
+
+    return {
+        'timestamp': np.asarray(columns['timestamp'])[picked],
+        'open': np.asarray(columns['open'])[starts],
+        'high': np.fmax.reduceat(columns['high'], starts),
+        'low': np.fmin.reduceat(columns['low'], starts),
+        'close': np.asarray(columns['close'])[picked],
+        'volume': np.add.reduceat(np.nan_to_num(columns['volume']), starts),
+    }
@@ -1,41 +1,299 @@
 import finnhub
 import pandas as pd
 import numpy as np
+import threading
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
+from data.bar_store import BarStore, COLUMNS
+from data.scheduler import scheduler, PRIORITY_CHART, PRIORITY_HISTORY
+from data.provider_health import provider_health, CircuitOpen
 
 load_dotenv()
 
+BAR_STORE_DIR = os.getenv('BAR_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'store'))
+
+DAILY_INTERVALS = ['1d', '1wk', '1mo']
+
+# How long each bar covers; a bar is only persisted once this much time has passed
+INTERVAL_DURATIONS = {
+    '1m': pd.Timedelta(minutes=1),
+    '5m': pd.Timedelta(minutes=5),
+    '15m': pd.Timedelta(minutes=15),
+    '30m': pd.Timedelta(minutes=30),
+    '1h': pd.Timedelta(hours=1),
+    '1d': pd.Timedelta(days=1),
+    '1wk': pd.Timedelta(weeks=1),
+    '1mo': pd.Timedelta(days=31),
+}
+
+FINNHUB_RESOLUTIONS = {
+    '1m': '1', '5m': '5', '15m': '15', '30m': '30', '1h': '60', '1d': 'D', '1wk': 'W', '1mo': 'M'
+}
+
+YAHOO_INTERVALS = {'1h': '60m'}
+
+# How far back Yahoo Finance serves intraday bars. A stored series whose last bar is older than this
+# can't be extended (the tail request comes back empty), so the whole window is fetched instead
+MAX_TAIL_AGE = {
+    '1m': timedelta(days=7),
+    '5m': timedelta(days=60),
+    '15m': timedelta(days=60),
+    '30m': timedelta(days=60),
+    '1h': timedelta(days=730),
+}
+
+# When several providers can serve a request: 'sequential' only asks the next one after the
+# previous has failed, 'hedged' also asks it after PROVIDER_HEDGE_DELAY seconds, 'race' asks all at once
+PROVIDER_FETCH_MODE = os.getenv('PROVIDER_FETCH_MODE', 'hedged')
+PROVIDER_HEDGE_DELAYS = {
+    'sequential': float('inf'),
+    'hedged': float(os.getenv('PROVIDER_HEDGE_DELAY', '1.5')),
+    'race': 0.0,
+}
+if PROVIDER_FETCH_MODE not in PROVIDER_HEDGE_DELAYS:
+    raise ValueError(f"Invalid PROVIDER_FETCH_MODE '{PROVIDER_FETCH_MODE}'. "
+                     f"Must be one of: {', '.join(PROVIDER_HEDGE_DELAYS)}")
+PROVIDER_HEDGE_DELAY = PROVIDER_HEDGE_DELAYS[PROVIDER_FETCH_MODE]
+
+
+def empty_bars():
+    return pd.DataFrame({col: pd.Series(dtype='float64') for col in COLUMNS},
+                        index=pd.DatetimeIndex([], name='timestamp'))
+
+
+def normalize_daily_index(index):
+    """Label daily and longer bars with their trading date at midnight (naive UTC)"""
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize()
+
+
 class DataFetcher:
-    def __init__(self):
+    def __init__(self, store=None, health=None):
         self.client = finnhub.Client(api_key=os.getenv('FINNHUB_API_KEY'))
-    
+        self.store = store or BarStore(BAR_STORE_DIR)
+        self.health = health or provider_health
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _download_finnhub(self, ticker, interval, start_date, end_date):
+        candles = self.client.stock_candles(
+            ticker,
+            FINNHUB_RESOLUTIONS[interval],
+            int(start_date.timestamp()),
+            int(end_date.timestamp())
+        )
+
+        if candles['s'] == 'no_data':
+            return empty_bars()
+        if candles['s'] != 'ok':
+            raise ValueError(f"Unexpected Finnhub candle status for {ticker}: {candles['s']}")
+
+        df = pd.DataFrame({
+            'timestamp': pd.to_datetime(candles['t'], unit='s'),
+            'open': candles['o'],
+            'high': candles['h'],
+            'low': candles['l'],
+            'close': candles['c'],
+            'volume': candles['v']
+        }, dtype='float64')
+        df.set_index('timestamp', inplace=True)
+        if interval in DAILY_INTERVALS:
+            df.index = normalize_daily_index(df.index)
+        else:
+            df.index = df.index.tz_localize('UTC')
+        return df
+
+    def _download_yahoo(self, ticker, interval, start_date, end_date):
+        import yfinance as yf  # slow to import, so only loaded once Yahoo Finance is actually used
+        ydf = yf.Ticker(ticker).history(start=start_date, end=end_date,
+                                        interval=YAHOO_INTERVALS.get(interval, interval))
+        if ydf.empty:
+            return empty_bars()
+        ydf = ydf.rename(columns={
+            'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close', 'Volume': 'volume'
+        })
+        ydf = ydf[COLUMNS].astype('float64')
+        if interval in DAILY_INTERVALS:
+            ydf.index = normalize_daily_index(ydf.index)
+        ydf.index.name = 'timestamp'
+        return ydf
+
+    def _submit_download(self, source, ticker, interval, start_date, end_date, priority):
+        """Queue a provider download on the upstream scheduler and return its Future"""
+        downloads = {'finnhub': self._download_finnhub, 'yahoo': self._download_yahoo}
+        if source not in downloads:
+            raise ValueError(f"Unknown data source: {source}")
+        endpoint = f'candles/{interval}'
+
+        def timed_download():
+            # Timed here rather than at submit so time spent queued for a rate-limit slot isn't counted
+            started = time.monotonic()
+            try:
+                df = downloads[source](ticker, interval, start_date, end_date)
+            except Exception:
+                self.health.record(source, endpoint, False, time.monotonic() - started)
+                raise
+            self.health.record(source, endpoint, True, time.monotonic() - started)
+            return df
+
+        return scheduler.submit(source, timed_download, priority=priority)
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _plan(self, ticker, interval, start_date, end_date):
+        """Decide what to download: (fetch_start, is_tail) given what the store already covers"""
+        meta = self.store.info(ticker, interval)
+        if meta['rows'] and meta['start'] <= int(start_date.timestamp()):
+            last = datetime.fromtimestamp(meta['last'])
+            max_age = MAX_TAIL_AGE.get(interval)
+            if last >= start_date and (max_age is None or end_date - last <= max_age):
+                return min(last, end_date), True
+            print(f"DEBUG: Stored {ticker} {interval} bars end at {last}, too old to extend; refetching the window")
+        return start_date, False
+
+    def _persist(self, ticker, interval, fresh, is_tail, start_date):
+        """Store the completed downloaded bars and return the still-forming ones"""
+        complete = self._is_complete(fresh.index, interval)
+        with self._lock_for((ticker, interval)):
+            if is_tail:
+                self.store.append(ticker, interval, fresh[complete])
+            else:
+                self.store.replace(ticker, interval, fresh[complete], int(start_date.timestamp()))
+        return fresh[~complete]
+
+    def _with_forming(self, df, forming):
+        """Add the forming bar(s) that were not persisted after the stored window"""
+        if len(forming) and len(df):
+            forming = forming[forming.index > df.index[-1]]
+        if len(forming):
+            df = pd.concat([df, forming]) if len(df) else forming
+        return df
+
+    def get_bars(self, ticker, interval, start_date, end_date, source='yahoo', priority=PRIORITY_CHART):
+        """OHLCV bars for [start_date, end_date], served from the local bar store.
+
+        Only the tail since the last stored bar is requested from the provider.
+        Completed bars are appended to the store; the still-forming last bar is
+        returned but not persisted so it is refreshed on the next call.
+        Provider calls go through the shared upstream scheduler at `priority`.
+        """
+        df, _ = self.get_bars_hedged(ticker, interval, start_date, end_date, [source], priority=priority)
+        return df
+
+    def get_bars_hedged(self, ticker, interval, start_date, end_date, sources, priority=PRIORITY_CHART,
+                        hedge_delay=None, min_rows=1):
+        """Like get_bars, but trying several providers; returns (df, winning_source)"""
+        ticker = ticker.upper()
+        forming, source = self.sync_bars(ticker, interval, start_date, end_date, sources, priority,
+                                         hedge_delay=hedge_delay, min_rows=min_rows)
+        with self._lock_for((ticker, interval)):
+            df = self.store.read(ticker, interval, int(start_date.timestamp()), int(end_date.timestamp()))
+        return self._with_forming(df, forming), source
+
+    def sync_bars(self, ticker, interval, start_date, end_date, sources, priority=PRIORITY_CHART,
+                  hedge_delay=None, min_rows=1):
+        """Bring the stored bars up to date without reading them; returns (forming_bars, winning_source).
+
+        Callers read the window from the store themselves, e.g. in chunks.
+
+        Sources are ordered by observed health, fastest reliable first, and
+        providers whose circuit is open are skipped apart from periodic probes
+        that run alongside the first request. The next source is only started
+        once the previous has failed or hedge_delay seconds have passed
+        without a result (None uses PROVIDER_HEDGE_DELAY; 0 races them all at
+        once). The first valid download wins and the others are cancelled.
+        """
+        ticker = ticker.upper()
+        hedge_delay = PROVIDER_HEDGE_DELAY if hedge_delay is None else hedge_delay
+        fetch_start, is_tail = self._plan(ticker, interval, start_date, end_date)
+        ranked, probes = self.health.route(sources, f'candles/{interval}')
+
+        if not ranked and not probes:
+            if is_tail:
+                print(f"DEBUG: All providers for {ticker} {interval} are unavailable, serving stored bars")
+                return empty_bars(), 'store'
+            raise CircuitOpen(f"No data provider is currently available for {ticker} {interval}")
+
+        print(f"DEBUG: Bar store {'hit' if is_tail else 'miss'} for {ticker} {interval}, "
+              f"fetching since {fetch_start} from {', '.join(ranked) or 'none'}"
+              f"{' probing ' + ', '.join(probes) if probes else ''}")
+
+        pending = {}
+        remaining = ranked
+        for source in probes:
+            try:
+                pending[self._submit_download(source, ticker, interval, fetch_start, end_date, priority)] = source
+            except Exception as e:
+                print(f"DEBUG: Could not queue {source} probe for {ticker}: {str(e)}")
+        if not remaining and not pending:
+            raise CircuitOpen(f"No data provider is currently available for {ticker} {interval}")
+        last_error = None
+        winner = None
+        best = None  # largest download that fell short of min_rows
+        try:
+            while winner is None and (pending or remaining):
+                if remaining:
+                    source = remaining.pop(0)
+                    try:
+                        future = self._submit_download(source, ticker, interval, fetch_start, end_date, priority)
+                        pending[future] = source
+                    except Exception as e:
+                        print(f"DEBUG: Could not queue {source} download for {ticker}: {str(e)}")
+                        last_error = e
+                        continue
+                # Give in-flight requests until the hedge delay, or until one finishes if nothing is left to start
+                timeout = hedge_delay if remaining and hedge_delay != float('inf') else None
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source = pending.pop(future)
+                    try:
+                        fresh = future.result()
+                    except Exception as e:
+                        print(f"DEBUG: {source} failed for {ticker}: {str(e)}")
+                        last_error = e
+                        continue
+                    if is_tail or len(fresh) >= min_rows:
+                        winner = (source, fresh)
+                        break
+                    print(f"DEBUG: {source} returned {len(fresh)} rows for {ticker}, need {min_rows}")
+                    if best is None or len(fresh) > len(best[1]):
+                        best = (source, fresh)
+        finally:
+            # Losers still waiting for a rate-limit slot are dropped without spending it
+            for future in pending:
+                future.cancel()
+
+        if winner is None:
+            if best is None:
+                if last_error is not None:
+                    raise last_error
+                best = ((ranked or probes)[-1], empty_bars())
+            winner = best
+
+        source, fresh = winner
+        print(f"DEBUG: {source} won for {ticker} {interval} with {len(fresh)} new rows")
+        return self._persist(ticker, interval, fresh, is_tail, start_date), source
+
+    def _is_complete(self, index, interval):
+        now = pd.Timestamp.now(tz='UTC')
+        if index.tz is None:
+            now = now.tz_localize(None)
+        return np.asarray(index + INTERVAL_DURATIONS[interval] <= now)
+
     def fetch_historical_data(self, ticker, days=365):
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
         try:
-            candles = self.client.stock_candles(
-                ticker,
-                'D',
-                int(start_date.timestamp()),
-                int(end_date.timestamp())
-            )
-            
-            if candles['s'] == 'no_data':
+            df = self.get_bars(ticker, '1d', start_date, end_date, source='finnhub', priority=PRIORITY_HISTORY)
+            if len(df) == 0:
                 return None
-                
-            df = pd.DataFrame({
-                'timestamp': pd.to_datetime(candles['t'], unit='s'),
-                'open': candles['o'],
-                'high': candles['h'],
-                'low': candles['l'],
-                'close': candles['c'],
-                'volume': candles['v']
-            })
-            
-            df.set_index('timestamp', inplace=True)
             return df
             
         except Exception as e:
@@ -43,18 +301,10 @@ class DataFetcher:
             return None
     
     def calculate_technical_indicators(self, df):
+        """Return a copy of df with MA20, MA50 and RSI columns (see data.indicators for the full set)"""
         if df is None or len(df) == 0:
             return None
-            
-        # Calculate moving averages
-        df['MA20'] = df['close'].rolling(window=20).mean()
-        df['MA50'] = df['close'].rolling(window=50).mean()
+        from data.indicators import compute
         
-        # Calculate RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
-        
-        return df
+        values = compute(df, 'sma:20,sma:50,rsi:14')
+        return df.assign(MA20=values['sma_20'], MA50=values['sma_50'], RSI=values['rsi_14'])
@@ -0,0 +1,447 @@
+import copy
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+DEFAULT_INDICATORS = 'sma:20,sma:50,ema:20,rsi:14,macd:12:26:9,bbands:20:2,atr:14,vwap'
+
+# Above this many new bars an update recomputes everything vectorized instead of bar by bar
+REBUILD_BARS = 256
+
+MAX_PERIOD = 1000
+
+
+def _ema(x, alpha):
+    """Exponential moving average seeded with the first value, as the incremental update does"""
+    if not len(x):
+        return np.empty(0)
+    return pd.Series(x).ewm(alpha=alpha, adjust=False).mean().to_numpy(copy=True)
+
+
+def _masked(values, valid_from):
+    values[:valid_from] = np.nan
+    return values
+
+
+class _Ema:
+    """Running exponential average; batch() fills it from an array, update() adds one value"""
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.value = None
+
+    def batch(self, x):
+        values = _ema(x, self.alpha)
+        self.value = values[-1] if len(values) else None
+        return values
+
+    def update(self, x):
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+
+class _Window:
+    """Running sum and sum of squares over the last `period` values"""
+
+    def __init__(self, period):
+        self.period = period
+        self.values = deque(maxlen=period)
+        self.total = 0.0
+        self.squares = 0.0
+
+    def fill(self, x):
+        self.values = deque((float(v) for v in x[-self.period:]), maxlen=self.period)
+        self.total = float(sum(self.values))
+        self.squares = float(sum(v * v for v in self.values))
+
+    def update(self, x):
+        if len(self.values) == self.period:
+            dropped = self.values[0]
+            self.total -= dropped
+            self.squares -= dropped * dropped
+        self.values.append(x)
+        self.total += x
+        self.squares += x * x
+        return len(self.values) == self.period
+
+
+class SMA:
+    def __init__(self, period=20):
+        self.period = int(period)
+        self.names = [f'sma_{self.period}']
+        self._window = _Window(self.period)
+
+    def batch(self, bars):
+        close = bars['close']
+        mean = np.full(len(close), np.nan)
+        if len(close) >= self.period:
+            mean[self.period - 1:] = sliding_window_view(close, self.period).mean(axis=1)
+        self._window.fill(close)
+        return {self.names[0]: mean}
+
+    def update(self, bar):
+        full = self._window.update(bar['close'])
+        return {self.names[0]: self._window.total / self.period if full else np.nan}
+
+
+class EMA:
+    def __init__(self, period=20):
+        self.period = int(period)
+        self.names = [f'ema_{self.period}']
+        self._ema = _Ema(2 / (self.period + 1))
+        self._count = 0
+
+    def batch(self, bars):
+        self._count = len(bars['close'])
+        return {self.names[0]: _masked(self._ema.batch(bars['close']), self.period - 1)}
+
+    def update(self, bar):
+        self._count += 1
+        value = self._ema.update(bar['close'])
+        return {self.names[0]: value if self._count >= self.period else np.nan}
+
+
+class RSI:
+    """Relative strength index with Wilder's smoothing of gains and losses"""
+
+    def __init__(self, period=14):
+        self.period = int(period)
+        self.names = [f'rsi_{self.period}']
+        self._gain = _Ema(1 / self.period)
+        self._loss = _Ema(1 / self.period)
+        self._prev = None
+        self._count = 0
+
+    def batch(self, bars):
+        close = bars['close']
+        rsi = np.full(len(close), np.nan)
+        if len(close) > 1:
+            delta = np.diff(close)
+            gain = self._gain.batch(np.maximum(delta, 0))
+            loss = self._loss.batch(np.maximum(-delta, 0))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                rsi[1:] = 100 * gain / (gain + loss)
+        self._prev = close[-1] if len(close) else None
+        self._count = len(close)
+        return {self.names[0]: _masked(rsi, self.period)}
+
+    def update(self, bar):
+        close = bar['close']
+        self._count += 1
+        rsi = np.nan
+        if self._prev is not None:
+            delta = close - self._prev
+            gain = self._gain.update(max(delta, 0.0))
+            loss = self._loss.update(max(-delta, 0.0))
+            if gain + loss > 0:
+                rsi = 100 * gain / (gain + loss)
+        self._prev = close
+        return {self.names[0]: rsi if self._count > self.period else np.nan}
+
+
+class MACD:
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast, self.slow, self.signal = int(fast), int(slow), int(signal)
+        suffix = '' if (self.fast, self.slow, self.signal) == (12, 26, 9) else f'_{self.fast}_{self.slow}_{self.signal}'
+        self.names = [f'macd{suffix}', f'macd_signal{suffix}', f'macd_hist{suffix}']
+        self._fast = _Ema(2 / (self.fast + 1))
+        self._slow = _Ema(2 / (self.slow + 1))
+        self._signal = _Ema(2 / (self.signal + 1))
+        self._count = 0
+
+    def _valid_from(self):
+        return max(self.fast, self.slow) - 1
+
+    def batch(self, bars):
+        close = bars['close']
+        macd = self._fast.batch(close) - self._slow.batch(close)
+        signal = self._signal.batch(macd)
+        hist = macd - signal
+        self._count = len(close)
+        start = self._valid_from()
+        return dict(zip(self.names, (_masked(macd, start), _masked(signal, start + self.signal - 1),
+                                     _masked(hist, start + self.signal - 1))))
+
+    def update(self, bar):
+        close = bar['close']
+        macd = self._fast.update(close) - self._slow.update(close)
+        signal = self._signal.update(macd)
+        self._count += 1
+        start = self._valid_from()
+        values = (macd if self._count > start else np.nan,
+                  signal if self._count >= start + self.signal else np.nan,
+                  macd - signal if self._count >= start + self.signal else np.nan)
+        return dict(zip(self.names, values))
+
+
+class BollingerBands:
+    """Moving average with bands `width` population standard deviations above and below"""
+
+    def __init__(self, period=20, width=2):
+        self.period = int(period)
+        self.width = float(width)
+        suffix = f'_{self.period}' if self.width == 2 else f'_{self.period}_{self.width:g}'
+        self.names = [f'bb_middle{suffix}', f'bb_upper{suffix}', f'bb_lower{suffix}']
+        self._window = _Window(self.period)
+
+    def batch(self, bars):
+        close = bars['close']
+        middle = np.full(len(close), np.nan)
+        std = np.full(len(close), np.nan)
+        if len(close) >= self.period:
+            windows = sliding_window_view(close, self.period)
+            middle[self.period - 1:] = windows.mean(axis=1)
+            std[self.period - 1:] = windows.std(axis=1)
+        self._window.fill(close)
+        return dict(zip(self.names, (middle, middle + self.width * std, middle - self.width * std)))
+
+    def update(self, bar):
+        if not self._window.update(bar['close']):
+            return dict.fromkeys(self.names, np.nan)
+        middle = self._window.total / self.period
+        std = np.sqrt(max(self._window.squares / self.period - middle * middle, 0.0))
+        return dict(zip(self.names, (middle, middle + self.width * std, middle - self.width * std)))
+
+
+class ATR:
+    """Average true range with Wilder's smoothing"""
+
+    def __init__(self, period=14):
+        self.period = int(period)
+        self.names = [f'atr_{self.period}']
+        self._atr = _Ema(1 / self.period)
+        self._prev = None
+        self._count = 0
+
+    def batch(self, bars):
+        high, low, close = bars['high'], bars['low'], bars['close']
+        ranges = high - low
+        if len(close) > 1:
+            prev = close[:-1]
+            ranges[1:] = np.maximum.reduce([ranges[1:], np.abs(high[1:] - prev), np.abs(low[1:] - prev)])
+        self._prev = close[-1] if len(close) else None
+        self._count = len(close)
+        return {self.names[0]: _masked(self._atr.batch(ranges), self.period - 1)}
+
+    def update(self, bar):
+        true_range = bar['high'] - bar['low']
+        if self._prev is not None:
+            true_range = max(true_range, abs(bar['high'] - self._prev), abs(bar['low'] - self._prev))
+        self._prev = bar['close']
+        self._count += 1
+        value = self._atr.update(true_range)
+        return {self.names[0]: value if self._count >= self.period else np.nan}
+
+
+class VWAP:
+    """Volume-weighted average of the typical price, restarting each session"""
+
+    def __init__(self):
+        self.names = ['vwap']
+        self._session = None
+        self._pv = 0.0
+        self._volume = 0.0
+
+    def batch(self, bars):
+        session = bars['session']
+        pv = (bars['high'] + bars['low'] + bars['close']) / 3 * bars['volume']
+        volume = bars['volume']
+        vwap = np.full(len(session), np.nan)
+        if len(session):
+            positions = np.arange(len(session))
+            starts = np.maximum.accumulate(np.where(np.r_[True, session[1:] != session[:-1]], positions, 0))
+            session_pv = np.cumsum(pv) - np.r_[0.0, np.cumsum(pv)][starts]
+            session_volume = np.cumsum(volume) - np.r_[0.0, np.cumsum(volume)][starts]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                vwap = np.where(session_volume > 0, session_pv / session_volume, np.nan)
+            self._session, self._pv, self._volume = session[-1], session_pv[-1], session_volume[-1]
+        return {'vwap': vwap}
+
+    def update(self, bar):
+        if bar['session'] != self._session:
+            self._session, self._pv, self._volume = bar['session'], 0.0, 0.0
+        self._pv += (bar['high'] + bar['low'] + bar['close']) / 3 * bar['volume']
+        self._volume += bar['volume']
+        return {'vwap': self._pv / self._volume if self._volume > 0 else np.nan}
+
+
+INDICATORS = {
+    'sma': (SMA, 1),
+    'ema': (EMA, 1),
+    'rsi': (RSI, 1),
+    'macd': (MACD, 3),
+    'bbands': (BollingerBands, 2),
+    'atr': (ATR, 1),
+    'vwap': (VWAP, 0),
+}
+
+
+def parse_specs(raw):
+    """Parse 'name[:param...]' comma-separated indicator specs into a hashable tuple"""
+    specs = []
+    for item in (raw or DEFAULT_INDICATORS).split(','):
+        parts = item.strip().lower().split(':')
+        if not parts[0]:
+            continue
+        if parts[0] not in INDICATORS:
+            raise ValueError(f"Unknown indicator '{parts[0]}'. Must be one of: {', '.join(INDICATORS)}")
+        max_params = INDICATORS[parts[0]][1]
+        if len(parts) - 1 > max_params:
+            raise ValueError(f"Indicator '{parts[0]}' takes at most {max_params} parameters")
+        try:
+            params = tuple(float(p) for p in parts[1:])
+        except ValueError:
+            raise ValueError(f"Invalid parameters for indicator '{item.strip()}'")
+        if any(not 0 < p <= MAX_PERIOD for p in params):
+            raise ValueError(f"Indicator parameters must be between 0 and {MAX_PERIOD}")
+        spec = (parts[0],) + params
+        if spec not in specs:
+            specs.append(spec)
+    if not specs:
+        raise ValueError("At least one indicator is required")
+    return tuple(specs)
+
+
+def build(specs):
+    return [INDICATORS[name][0](*params) for name, *params in specs]
+
+
+def session_keys(timestamps, tz=None, intraday=True):
+    """Session of each bar for VWAP: the exchange-local day intraday, a single session otherwise"""
+    if not intraday:
+        return np.zeros(len(timestamps), dtype='int64')
+    if tz:
+        local = pd.to_datetime(timestamps, unit='s', utc=True).tz_convert(tz).tz_localize(None)
+        return local.asi8 // (86400 * 10**9)
+    return np.asarray(timestamps) // 86400
+
+
+def _bars(columns, sessions, start=0, stop=None):
+    bars = {name: np.asarray(columns[name], dtype='float64')[start:stop]
+            for name in ('open', 'high', 'low', 'close', 'volume') if name in columns}
+    bars['session'] = sessions[start:stop]
+    return bars
+
+
+def compute(columns, specs=DEFAULT_INDICATORS, sessions=None):
+    """One-off vectorized computation over OHLCV columns (a dict of arrays or a DataFrame)"""
+    specs = parse_specs(specs) if isinstance(specs, str) else specs
+    length = len(columns['close'])
+    sessions = np.zeros(length, dtype='int64') if sessions is None else sessions
+    bars = _bars(columns, sessions)
+    values = {}
+    for indicator in build(specs):
+        values.update(indicator.batch(bars))
+    return values
+
+
+class IndicatorEngine:
+    """Indicators for one bar series, kept current as new bars arrive.
+
+    The first update computes every indicator vectorized over the whole
+    series and keeps each one's rolling state (windows, running averages,
+    session totals). Later updates only process bars from the last one seen
+    onward, in O(1) per bar; the last bar is always recomputed, so a forming
+    bar that has changed since the previous update is corrected. Bars before
+    it are assumed final. If the series no longer contains the last bar seen
+    (or starts earlier than before), everything is recomputed.
+    """
+
+    def __init__(self, specs, intraday=True):
+        self.specs = specs
+        self.intraday = intraday
+        self.indicators = build(specs)
+        self.names = [name for indicator in self.indicators for name in indicator.names]
+        self._columns = None  # name -> preallocated array, valid up to _length
+        self._length = 0
+        self._before_last = None  # indicator state before the last bar was applied
+        self._lock = threading.Lock()
+
+    def _reserve(self, extra):
+        needed = self._length + extra
+        if self._columns is not None and len(self._columns['timestamp']) >= needed:
+            return
+        capacity = max(needed, 2 * self._length, 64)
+        grown = {'timestamp': np.zeros(capacity, dtype='int64')}
+        grown.update({name: np.full(capacity, np.nan) for name in self.names})
+        if self._columns is not None:
+            for name, values in grown.items():
+                values[:self._length] = self._columns[name][:self._length]
+        self._columns = grown
+
+    def _apply(self, timestamp, bar):
+        row = {'timestamp': timestamp}
+        for indicator in self.indicators:
+            row.update(indicator.update(bar))
+        self._reserve(1)
+        for name, value in row.items():
+            self._columns[name][self._length] = value
+        self._length += 1
+
+    def _apply_last(self, timestamp, bar):
+        self._before_last = copy.deepcopy(self.indicators)
+        self._apply(timestamp, bar)
+
+    def _rebuild(self, columns, sessions):
+        """Vectorized pass over all but the last bar, which is applied incrementally"""
+        timestamps = columns['timestamp']
+        self.indicators = build(self.specs)
+        self._columns, self._length = None, 0
+        head = len(timestamps) - 1
+        self._reserve(len(timestamps))
+        bars = _bars(columns, sessions, 0, head)
+        for indicator in self.indicators:
+            for name, values in indicator.batch(bars).items():
+                self._columns[name][:head] = values
+        self._columns['timestamp'][:head] = timestamps[:head]
+        self._length = head
+        self._apply_last(int(timestamps[-1]), {name: values[-1] for name, values in _bars(columns, sessions, head).items()})
+
+    def _extend(self, columns, sessions, start):
+        """Re-apply the last bar seen (at position start) and add the bars after it one by one"""
+        self.indicators = self._before_last
+        self._length -= 1
+        timestamps = columns['timestamp']
+        bars = _bars(columns, sessions, start)
+        for offset in range(len(timestamps) - start):
+            bar = {name: values[offset] for name, values in bars.items()}
+            timestamp = int(timestamps[start + offset])
+            if start + offset == len(timestamps) - 1:
+                self._apply_last(timestamp, bar)
+            else:
+                self._apply(timestamp, bar)
+
+    def update(self, columns, tz=None):
+        """Bring the indicators up to date with OHLCV columns (timestamps in epoch seconds).
+
+        Returns a copy of the timestamp and indicator columns covering the
+        same bars as `columns`.
+        """
+        timestamps = columns['timestamp']
+        if not len(timestamps):
+            return {name: np.empty(0) for name in ['timestamp'] + self.names}
+        with self._lock:
+            sessions = session_keys(timestamps, tz, self.intraday)
+            start = None
+            if self._length:
+                seen = self._columns['timestamp'][:self._length]
+                start = int(np.searchsorted(timestamps, seen[-1]))
+                if (start == len(timestamps) or timestamps[start] != seen[-1] or timestamps[0] < seen[0]
+                        or len(timestamps) - start > REBUILD_BARS):
+                    start = None
+            if start is None:
+                self._rebuild(columns, sessions)
+            else:
+                self._extend(columns, sessions, start)
+
+            # Drop bars that have left the window once they make up half the buffer
+            first = int(np.searchsorted(self._columns['timestamp'][:self._length], timestamps[0]))
+            if first and first * 2 >= self._length:
+                for name, values in self._columns.items():
+                    values[:self._length - first] = values[first:self._length].copy()
+                self._length -= first
+                first = 0
+            return {name: values[first:self._length].copy() for name, values in self._columns.items()}
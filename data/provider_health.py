@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+from collections import deque
+
+
+class CircuitOpen(Exception):
+    """Raised when every provider able to serve a request is currently skipped"""
+
+
+class _Circuit:
+    def __init__(self, window):
+        self.results = deque(maxlen=window)  # (ok, latency_seconds)
+        self.open = False
+        self.retry_at = 0.0
+
+    def success_rate(self):
+        return sum(ok for ok, _ in self.results) / len(self.results)
+
+    def mean_latency(self):
+        return sum(latency for _, latency in self.results) / len(self.results)
+
+
+class ProviderHealth:
+    """Rolling success rate and latency per (provider, endpoint), with a circuit breaker.
+
+    A circuit opens once at least min_calls of the last `window` calls were
+    recorded and the failure rate reaches failure_threshold. While open the
+    provider is skipped, except for one probe request every open_seconds; a
+    successful probe closes the circuit again.
+    """
+
+    def __init__(self, window=20, failure_threshold=0.5, min_calls=5, open_seconds=120):
+        self.window = window
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, provider, endpoint):
+        return self._circuits.setdefault((provider, endpoint), _Circuit(self.window))
+
+    def record(self, provider, endpoint, ok, latency):
+        with self._lock:
+            circuit = self._circuit(provider, endpoint)
+            circuit.results.append((bool(ok), latency))
+            if circuit.open:
+                if ok:
+                    print(f"DEBUG: Circuit for {provider} {endpoint} closed after successful probe")
+                    circuit.open = False
+                    circuit.results.clear()
+                    circuit.results.append((True, latency))
+                return
+            if len(circuit.results) >= self.min_calls and 1 - circuit.success_rate() >= self.failure_threshold:
+                print(f"DEBUG: Circuit for {provider} {endpoint} opened, success rate {circuit.success_rate():.0%}")
+                circuit.open = True
+                circuit.retry_at = time.monotonic() + self.open_seconds
+
+    def _expected_latency(self, circuit):
+        if not circuit.results:
+            return 0.0  # untried providers get a chance before known slow ones
+        return circuit.mean_latency() / max(circuit.success_rate(), 0.05)
+
+    def route(self, providers, endpoint):
+        """Split providers into (ranked, probes).
+
+        ranked holds closed-circuit providers, best expected latency first
+        (ties keep the given order). probes holds open-circuit providers that
+        are due a probe; each probe slot is handed out once per open_seconds.
+        """
+        now = time.monotonic()
+        ranked, probes = [], []
+        with self._lock:
+            for position, provider in enumerate(providers):
+                circuit = self._circuit(provider, endpoint)
+                if not circuit.open:
+                    ranked.append((self._expected_latency(circuit), position, provider))
+                elif now >= circuit.retry_at:
+                    circuit.retry_at = now + self.open_seconds
+                    probes.append(provider)
+        return [provider for _, _, provider in sorted(ranked)], probes
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                f"{provider}/{endpoint}": {
+                    'state': 'open' if circuit.open else 'closed',
+                    'calls': len(circuit.results),
+                    'success_rate': round(circuit.success_rate(), 3) if circuit.results else None,
+                    'mean_latency_ms': round(circuit.mean_latency() * 1000, 1) if circuit.results else None,
+                }
+                for (provider, endpoint), circuit in self._circuits.items()
+            }
+
+
+provider_health = ProviderHealth(
+    window=int(os.getenv('PROVIDER_HEALTH_WINDOW', '20')),
+    failure_threshold=float(os.getenv('PROVIDER_FAILURE_THRESHOLD', '0.5')),
+    min_calls=int(os.getenv('PROVIDER_MIN_CALLS', '5')),
+    open_seconds=float(os.getenv('PROVIDER_OPEN_SECONDS', '120')),
+)
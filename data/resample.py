@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+INTERVAL_SECONDS = {
+    '1m': 60,
+    '5m': 5 * 60,
+    '15m': 15 * 60,
+    '30m': 30 * 60,
+    '1h': 60 * 60,
+    '1d': 24 * 60 * 60,
+}
+
+INTERVAL_ORDER = ['1m', '5m', '15m', '30m', '1h', '1d', '1wk', '1mo']
+
+
+def base_interval(interval, days):
+    """Finest interval worth fetching for a window, from which `interval` can be derived.
+
+    Mirrors the chart's interval options per range (and Yahoo Finance's
+    history limits) so every interval offered for a range shares one download.
+    """
+    if interval in ('1d', '1wk', '1mo'):
+        return '1d'
+    if days <= 1:
+        base = '1m'
+    elif days <= 7:
+        base = '5m'
+    elif days <= 59:
+        base = '30m'
+    else:
+        base = '1h'
+    if INTERVAL_ORDER.index(base) > INTERVAL_ORDER.index(interval) or INTERVAL_SECONDS[interval] % INTERVAL_SECONDS[base]:
+        return interval
+    return base
+
+
+def _bucket_starts(wall, interval):
+    """Start (wall-clock epoch seconds) of the target bar each source bar falls into"""
+    if interval == '1mo':
+        return wall.astype('datetime64[s]').astype('datetime64[M]').astype('datetime64[s]').astype('int64')
+    days = wall // 86400
+    if interval == '1wk':
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday
+        return (days - (days + 3) % 7) * 86400
+    if interval == '1d':
+        return days * 86400
+
+    # Intraday buckets are aligned to each session's first bar (e.g. 9:30 for US equities)
+    step = INTERVAL_SECONDS[interval]
+    positions = np.arange(len(wall))
+    new_day = np.r_[True, days[1:] != days[:-1]]
+    session_open = wall[np.maximum.accumulate(np.where(new_day, positions, 0))]
+    return session_open + (wall - session_open) // step * step
+
+
+def resample_bars(df, interval):
+    """Aggregate bars into a coarser interval with vectorized reductions.
+
+    Each output bar takes the first open, max high, min low, last close and
+    summed volume of the source bars that fall into it.
+    """
+    df = df.dropna(subset=['open', 'high', 'low', 'close'])
+    if df.empty:
+        return df
+
+    tz = df.index.tz
+    index = df.index.tz_localize(None) if tz is not None else df.index
+    wall = index.as_unit('s').asi8
+    buckets = _bucket_starts(wall, interval)
+
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+
+    labels = pd.to_datetime(buckets[starts], unit='s')
+    if tz is not None:
+        labels = labels.tz_localize(tz, ambiguous='NaT', nonexistent='shift_forward')
+    labels.name = df.index.name
+
+    return pd.DataFrame({
+        'open': df['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(df['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(df['low'].to_numpy(), starts),
+        'close': df['close'].to_numpy()[ends],
+        'volume': np.add.reduceat(np.nan_to_num(df['volume'].to_numpy()), starts),
+    }, index=labels)
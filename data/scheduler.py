@@ -0,0 +1,179 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Lower numbers are served first
+PRIORITY_QUOTE = 0     # interactive quotes and profiles
+PRIORITY_CHART = 1     # chart history
+PRIORITY_HISTORY = 2   # multi-year history pulls for training
+
+
+class RateLimited(Exception):
+    """Raised instead of queueing when a provider's budget cannot serve a call in time"""
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self):
+        """Take a token if one is available, otherwise return seconds until the next one"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def estimated_wait(self, queued):
+        """Seconds before a call with `queued` calls ahead of it would get a token"""
+        with self._lock:
+            self._refill()
+            return max(0.0, (queued + 1 - self._tokens) / self.rate)
+
+
+class _Provider:
+    def __init__(self, name, calls_per_minute, burst, workers):
+        # Size the refill rate so no 60s window can exceed calls_per_minute
+        rate = max(calls_per_minute - burst, 1) / 60.0
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.queue = queue.PriorityQueue()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'{name}-upstream')
+        self.inflight = {}  # dedup key -> Future
+        self.pending = Counter()  # priority -> queued calls
+        self.dispatcher = None
+
+
+class UpstreamScheduler:
+    """Central gate for provider calls.
+
+    Every call waits for a token from its provider's bucket and queued calls
+    are released in priority order, so interactive quotes overtake bulk
+    history pulls. Identical calls (same dedup key) share one Future, and
+    calls whose expected wait exceeds max_wait fail fast with RateLimited
+    instead of tying up a worker thread.
+    """
+
+    def __init__(self, limits, workers=4, max_queue=100, max_wait=5.0):
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._providers = {
+            name: _Provider(name, per_minute, burst, workers) for name, (per_minute, burst) in limits.items()
+        }
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def _provider(self, name):
+        provider = self._providers[name]
+        with self._lock:
+            if provider.dispatcher is None:
+                provider.dispatcher = threading.Thread(target=self._dispatch, args=(provider,),
+                                                       name=f'{name}-scheduler', daemon=True)
+                provider.dispatcher.start()
+        return provider
+
+    def _dispatch(self, provider):
+        while True:
+            item = provider.queue.get()
+            priority, _, future, fn, args, kwargs, key = item
+            if future.cancelled():
+                # Dropped while waiting (e.g. a hedge loser), so it never spends a token
+                continue
+            delay = provider.bucket.try_take()
+            if delay:
+                # Put it back so a higher-priority call arriving meanwhile goes first
+                provider.queue.put(item)
+                time.sleep(delay)
+                continue
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._lock:
+                provider.pending[priority] -= 1
+            provider.executor.submit(self._run, provider, future, fn, args, kwargs, key)
+
+    def _discard(self, provider, priority, key, future):
+        """Stop counting a call cancelled while queued; the dispatcher skips it when it comes up"""
+        if not future.cancelled():
+            return
+        with self._lock:
+            provider.pending[priority] -= 1
+        self._forget(provider, key, future)
+
+    def _run(self, provider, future, fn, args, kwargs, key):
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            self._forget(provider, key, future)
+
+    def _forget(self, provider, key, future):
+        if key is None:
+            return
+        with self._lock:
+            if provider.inflight.get(key) is future:
+                del provider.inflight[key]
+
+    def submit(self, provider_name, fn, *args, key=None, priority=PRIORITY_QUOTE, max_wait=None, **kwargs):
+        """Queue fn(*args, **kwargs) against a provider's budget and return a Future"""
+        provider = self._provider(provider_name)
+        max_wait = self.max_wait if max_wait is None else max_wait
+        with self._lock:
+            if key is not None and key in provider.inflight:
+                return provider.inflight[key]
+            queued = sum(provider.pending.values())
+            if queued >= self.max_queue:
+                raise RateLimited(f"{provider_name} request queue is full ({queued} waiting)")
+            ahead = sum(count for p, count in provider.pending.items() if p <= priority)
+            wait = provider.bucket.estimated_wait(ahead)
+            if wait > max_wait:
+                raise RateLimited(f"{provider_name} rate limit reached, next slot in {wait:.1f}s")
+            future = Future()
+            if key is not None:
+                provider.inflight[key] = future
+            provider.pending[priority] += 1
+            provider.queue.put((priority, next(self._seq), future, fn, args, kwargs, key))
+        future.add_done_callback(lambda f: self._discard(provider, priority, key, f))
+        return future
+
+    def call(self, provider_name, fn, *args, key=None, priority=PRIORITY_QUOTE, max_wait=None, **kwargs):
+        """Run fn through the scheduler and wait for its result"""
+        return self.submit(provider_name, fn, *args, key=key, priority=priority, max_wait=max_wait, **kwargs).result()
+
+    def reserve(self, provider_name, priority=PRIORITY_QUOTE, max_wait=None):
+        """Future that resolves once a call may be made; for clients that do their own I/O"""
+        return self.submit(provider_name, lambda: None, priority=priority, max_wait=max_wait)
+
+    def status(self):
+        status = {}
+        for name, provider in self._providers.items():
+            with self._lock:
+                queued = sum(provider.pending.values())
+            status[name] = {'queued': queued, 'inflight': len(provider.inflight),
+                            'wait': round(provider.bucket.estimated_wait(queued), 3)}
+        return status
+
+
+scheduler = UpstreamScheduler(
+    {
+        'finnhub': (int(os.getenv('FINNHUB_CALLS_PER_MINUTE', '60')), int(os.getenv('FINNHUB_BURST', '5'))),
+        'yahoo': (int(os.getenv('YAHOO_CALLS_PER_MINUTE', '120')), int(os.getenv('YAHOO_BURST', '10'))),
+    },
+    workers=int(os.getenv('UPSTREAM_SCHEDULER_WORKERS', '4')),
+    max_queue=int(os.getenv('UPSTREAM_MAX_QUEUE', '100')),
+    max_wait=float(os.getenv('UPSTREAM_MAX_WAIT', '5')),
+)
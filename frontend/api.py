@@ -0,0 +1,207 @@
+"""Backend access for the Streamlit app: one pooled session, per-endpoint caching and concurrent loads"""
+import json
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+# Backend API URL from Streamlit secrets or default to localhost
+BACKEND_URL = st.secrets.get("BACKEND_URL", "https://stocktracker-backend-9n1j.onrender.com")
+
+BINARY_CONTENT_TYPE = 'application/x-stock-columns'
+
+# A chart card is only a few hundred pixels wide; the backend downsamples longer series
+CHART_MAX_POINTS = 500
+
+# How long responses are reused across reruns and sessions (seconds). Profiles change rarely;
+# quotes and charts only as often as the backend's own caches refresh them
+PROFILE_TTL = 6 * 60 * 60
+QUOTE_TTL = 10
+HEALTH_TTL = 30
+
+REQUEST_TIMEOUT = 15
+POOL_SIZE = 16
+
+CONNECTION_ERROR = "Could not connect to backend server."
+
+
+class BackendError(Exception):
+    """A non-success response from the backend, carrying its error message"""
+
+
+def get_api_url(endpoint):
+    """Helper function to build API URLs"""
+    return f"{BACKEND_URL}/api/{endpoint}"
+
+
+@st.cache_resource
+def session():
+    """Keep-alive session shared by every script run, so calls reuse TCP/TLS connections"""
+    http = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+    http.mount('http://', adapter)
+    http.mount('https://', adapter)
+    return http
+
+
+def _resolve_columns(obj, body, base):
+    """Replace column references in a binary response header with arrays viewing the body"""
+    if isinstance(obj, dict):
+        if obj.keys() == {'dtype', 'offset', 'length'}:
+            return np.frombuffer(body, dtype=obj['dtype'], count=obj['length'], offset=base + obj['offset'])
+        return {key: _resolve_columns(value, body, base) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_resolve_columns(value, body, base) for value in obj]
+    return obj
+
+
+def decode_response(response):
+    """Decode a backend response, either JSON or the binary columnar chart format"""
+    if not response.headers.get('Content-Type', '').startswith(BINARY_CONTENT_TYPE):
+        return response.json()
+    body = response.content
+    (header_length,) = struct.unpack_from('<I', body)
+    header = json.loads(body[4:4 + header_length])
+    return _resolve_columns(header, body, 4 + header_length)
+
+
+def _get(endpoint, params=None):
+    """GET a backend endpoint and decode it, raising BackendError for error responses"""
+    response = session().get(get_api_url(endpoint), params=params, timeout=REQUEST_TIMEOUT)
+    if response.status_code != 200:
+        try:
+            message = response.json().get('error', f"HTTP {response.status_code}")
+        except ValueError:
+            message = f"HTTP {response.status_code}"
+        raise BackendError(message)
+    return decode_response(response)
+
+
+def _result(load, *args):
+    """Run a cached loader, returning (data, error); failures are not cached"""
+    try:
+        return load(*args), None
+    except BackendError as e:
+        return None, str(e)
+    except requests.exceptions.ConnectionError:
+        return None, CONNECTION_ERROR
+    except requests.exceptions.RequestException as e:
+        return None, f"Connection error: {str(e)}"
+
+
+@st.cache_data(ttl=HEALTH_TTL, show_spinner=False)
+def _health():
+    return session().get(get_api_url("health"), timeout=REQUEST_TIMEOUT).status_code == 200
+
+
+def check_backend_health():
+    """Check if backend is accessible (remembered for HEALTH_TTL seconds)"""
+    try:
+        return _health()
+    except requests.RequestException:
+        return False
+
+
+@st.cache_data(ttl=PROFILE_TTL, show_spinner=False)
+def _profile(ticker):
+    return _get(f"stock/profile/{ticker}")
+
+
+def fetch_profile(ticker):
+    return _result(_profile, ticker)
+
+
+@st.cache_data(ttl=QUOTE_TTL, show_spinner=False)
+def _quote(ticker):
+    return _get(f"stock/quote/{ticker}")
+
+
+def fetch_quote(ticker):
+    return _result(_quote, ticker)
+
+
+@st.cache_data(ttl=QUOTE_TTL, show_spinner=False)
+def _quotes_and_charts(tickers, charts):
+    return _get("stock/portfolio", {'tickers': ','.join(tickers), 'charts': ','.join(charts),
+                                    'parts': 'quote,intraday', 'format': 'binary',
+                                    'max_points': CHART_MAX_POINTS})['cards']
+
+
+def _in_threads(calls):
+    """Run (fn, *args) calls concurrently, returning their results in order"""
+    ctx = None
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except ImportError:
+        pass
+
+    def attach():
+        # Cached functions look up the running script's context; share ours with the pool threads
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+
+    with ThreadPoolExecutor(max_workers=min(POOL_SIZE, len(calls)) or 1, initializer=attach) as pool:
+        futures = [pool.submit(fn, *args) for fn, *args in calls]
+        return [future.result() for future in futures]
+
+
+def fetch_cards(tickers, charts):
+    """Profile, quote and chart data for every card, loaded concurrently before anything renders.
+
+    charts are TICKER:INTERVAL:DAYS[:SINCE] specs. Quotes and charts for all
+    tickers come from one portfolio request; profiles are fetched per ticker
+    but cached for hours, so after the first load only that request remains.
+    Returns {ticker: {'profile', 'quote', 'intraday', 'errors'}}.
+    """
+    tickers = tuple(tickers)
+    results = _in_threads([(_result, _quotes_and_charts, tickers, tuple(charts))] +
+                          [(fetch_profile, ticker) for ticker in tickers])
+    cards, error = results[0]
+    cards = dict(cards or {})
+    for ticker, (profile, profile_error) in zip(tickers, results[1:]):
+        card = dict(cards.get(ticker) or {'quote': None, 'intraday': None,
+                                          'errors': {'quote': error or 'Unknown error'}})
+        card['errors'] = dict(card.get('errors', {}))
+        card['profile'] = profile
+        if profile_error:
+            card['errors']['profile'] = profile_error
+        cards[ticker] = card
+    return cards
+
+
+# Function to fetch prediction
+PREDICTION_TIMEOUT = 180  # seconds to keep polling a prediction job
+PREDICTION_POLL_INTERVAL = 1
+
+
+def fetch_prediction(ticker):
+    """Submit a prediction job and poll it until it finishes"""
+    try:
+        response = session().post(get_api_url(f"stock/predict/{ticker}"), timeout=10)
+        job = response.json() if response.content else {}
+        if response.status_code != 202:
+            return {'error': job.get('error', f"HTTP {response.status_code}")}
+
+        deadline = time.time() + PREDICTION_TIMEOUT
+        while job.get('status') in ('queued', 'running'):
+            if time.time() > deadline:
+                return {'error': 'Prediction is taking longer than expected, please try again later'}
+            time.sleep(PREDICTION_POLL_INTERVAL)
+            response = session().get(f"{BACKEND_URL}{job['status_url']}", timeout=10)
+            if response.status_code != 200:
+                return {'error': response.json().get('error', 'Unknown error') if response.content else f"HTTP {response.status_code}"}
+            job = dict(response.json(), status_url=job['status_url'])
+
+        if job.get('status') == 'done':
+            return job['result']
+        return {'error': job.get('error', 'Unknown error')}
+    except requests.exceptions.RequestException as e:
+        return {'error': f'Connection error: {str(e)}'}
+    except Exception as e:
+        return {'error': str(e)}
@@ -1,26 +1,46 @@
 import streamlit as st
 st.set_page_config(page_title="Stock Portfolio Predictor", layout="wide")
 
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-import requests
 from datetime import datetime
-import time
+from zoneinfo import ZoneInfo
 
-# Backend API URL from Streamlit secrets or default to localhost
-BACKEND_URL = st.secrets.get("BACKEND_URL", "https://stocktracker-backend-9n1j.onrender.com")
+from api import (
+    CHART_MAX_POINTS, CONNECTION_ERROR, BACKEND_URL, check_backend_health, fetch_cards, fetch_prediction, fetch_quote
+)
 
-def get_api_url(endpoint):
-    """Helper function to build API URLs"""
-    return f"{BACKEND_URL}/api/{endpoint}"
+def series_frame(response_data):
+    """Chart DataFrame from epoch-second columns, timestamps in the exchange's wall-clock time"""
+    data = response_data['data']
+    df = pd.DataFrame({name: values for name, values in data.items() if name != 'timestamp'})
+    timestamps = pd.to_datetime(np.asarray(data['timestamp'], dtype='int64'), unit='s', utc=True)
+    df['timestamp'] = timestamps.tz_convert(response_data.get('timezone', 'UTC')).tz_localize(None)
+    return df
 
-def check_backend_health():
-    """Check if backend is accessible"""
-    try:
-        response = requests.get(get_api_url("health"))
-        return response.status_code == 200
-    except requests.RequestException:
-        return False
+def chart_cursor(ticker, interval, days):
+    """Timestamp of the last bar already held for this chart, to request only newer bars; None for a full load"""
+    held = st.session_state.chart_series.get(ticker)
+    if not held or held['key'] != (interval, days) or not len(held['payload']['data']['timestamp']):
+        return None
+    # Bars appended at full resolution pile up on the downsampled series; reload it now and then
+    if len(held['payload']['data']['timestamp']) > 2 * CHART_MAX_POINTS:
+        return None
+    return int(held['payload']['data']['timestamp'][-1])
+
+def merge_chart(ticker, interval, days, intraday):
+    """Combine a chart response with the series held in session state and keep the result"""
+    held = st.session_state.chart_series.get(ticker)
+    if intraday.get('delta') and held and held['key'] == (interval, days):
+        old, new = held['payload']['data'], intraday['data']
+        # The delta starts with a revised copy of our last bar; bars before first_timestamp left the window
+        old_timestamps = np.asarray(old['timestamp'])
+        keep = (old_timestamps < new['timestamp'][0]) & (old_timestamps >= intraday['first_timestamp'])
+        data = {name: np.concatenate([np.asarray(old[name])[keep], np.asarray(new[name])]) for name in new}
+        intraday = dict(intraday, data=data)
+    st.session_state.chart_series[ticker] = {'key': (interval, days), 'payload': intraday}
+    return intraday
 
 # Check backend health
 if not check_backend_health():
@@ -54,74 +74,84 @@ POPULAR_STOCKS = {
     }
 }
 
-def create_intraday_chart(ticker):
-    """Create an intraday price chart using Yahoo Finance data"""
+CHART_RANGES = ['1D', '5D', '1M', '3M', '6M', '1Y', 'YTD']
+
+# Available intervals for each time range
+INTERVAL_OPTIONS = {
+    '1D': ['1m', '5m', '15m', '30m', '1h'],
+    '5D': ['5m', '15m', '30m', '1h'],
+    '1M': ['30m', '1h', '1d'],
+    '3M': ['1h', '1d', '1wk'],
+    '6M': ['1d', '1wk'],
+    '1Y': ['1d', '1wk', '1mo'],
+    'YTD': ['1d', '1wk', '1mo']
+}
+
+def range_to_days(time_range):
+    """Number of days of history covered by a time range"""
+    days_mapping = {
+        '1D': 1,
+        '5D': 5,
+        '1M': 30,
+        '3M': 90,
+        '6M': 180,
+        '1Y': 365,
+        'YTD': (datetime.now() - datetime(datetime.now().year, 1, 1)).days
+    }
+    return max(days_mapping[time_range], 1)
+
+def get_chart_selection(ticker):
+    """Resolve the time range and interval currently selected for a ticker's chart"""
+    if 'chart_range' not in st.session_state:
+        st.session_state.chart_range = '1D'
+    
+    if 'chart_interval' not in st.session_state:
+        st.session_state.chart_interval = '1h'
+    
+    # Widget values from the previous run take precedence over the shared defaults
+    time_range = st.session_state.get(f"range_{ticker}", st.session_state.chart_range)
+    options = INTERVAL_OPTIONS[time_range]
+    interval = st.session_state.get(f"interval_{ticker}", st.session_state.chart_interval)
+    if interval not in options:
+        interval = st.session_state.chart_interval if st.session_state.chart_interval in options else options[0]
+    return time_range, interval
+
+def create_intraday_chart(ticker, response_data, error=None):
+    """Create an intraday price chart from the chart data returned by the backend"""
     try:
-        # Add time range and interval selectors using session state
-        if 'chart_range' not in st.session_state:
-            st.session_state.chart_range = '1D'
+        time_range, selected_interval = get_chart_selection(ticker)
         
-        if 'chart_interval' not in st.session_state:
-            st.session_state.chart_interval = '1h'
-            
         # Create two columns for range and interval selectors
         range_col, interval_col = st.columns(2)
         
         # Time range selector
         time_range = range_col.selectbox(
             "Time Range",
-            ['1D', '5D', '1M', '3M', '6M', '1Y', 'YTD'],
-            index=['1D', '5D', '1M', '3M', '6M', '1Y', 'YTD'].index(st.session_state.chart_range),
+            CHART_RANGES,
+            index=CHART_RANGES.index(time_range),
             key=f"range_{ticker}"
         )
         st.session_state.chart_range = time_range
         
-        # Determine available intervals based on selected time range
-        interval_options = {
-            '1D': ['1m', '5m', '15m', '30m', '1h'],
-            '5D': ['5m', '15m', '30m', '1h'],
-            '1M': ['30m', '1h', '1d'],
-            '3M': ['1h', '1d', '1wk'],
-            '6M': ['1d', '1wk'],
-            '1Y': ['1d', '1wk', '1mo'],
-            'YTD': ['1d', '1wk', '1mo']
-        }
-        
         # Interval selector with dynamic options
+        options = INTERVAL_OPTIONS[time_range]
         interval = interval_col.selectbox(
             "Interval",
-            interval_options[time_range],
-            index=min(len(interval_options[time_range])-1, 
-                     interval_options[time_range].index(st.session_state.chart_interval) 
-                     if st.session_state.chart_interval in interval_options[time_range] else 0),
+            options,
+            index=options.index(selected_interval) if selected_interval in options else 0,
             key=f"interval_{ticker}"
         )
         st.session_state.chart_interval = interval
         
-        # Calculate days based on time range
-        days_mapping = {
-            '1D': 1,
-            '5D': 5,
-            '1M': 30,
-            '3M': 90,
-            '6M': 180,
-            '1Y': 365,
-            'YTD': (datetime.now() - datetime(datetime.now().year, 1, 1)).days
-        }
-        days = days_mapping[time_range]
-        
-        response = requests.get(
-            f"{BACKEND_URL}/api/stock/intraday/{ticker}",
-            params={'interval': interval, 'days': days}
-        )
+        if error:
+            st.warning(f"Could not load chart: {error}")
         
-        if response.status_code == 200:
-            response_data = response.json()
-            data = response_data['data']  # Access the 'data' key from the enhanced backend response
+        if response_data:
+            data = series_frame(response_data)
             
             # Check if we're showing data from a different date than today
-            if data['timestamp']:
-                last_data_date = pd.to_datetime(data['timestamp'][-1]).date()
+            if len(data):
+                last_data_date = data['timestamp'].iloc[-1].date()
                 today = datetime.now().date()
                 current_time = datetime.now().time()
                 
@@ -179,14 +209,9 @@ def create_intraday_chart(ticker):
             ))
             
             # Calculate moving averages
-            df = pd.DataFrame({
-                'close': data['close'],
-                'timestamp': data['timestamp']
-            })
-            
             ma_periods = [9, 20]
             for period in ma_periods:
-                ma = df['close'].rolling(window=period).mean()
+                ma = data['close'].rolling(window=period).mean()
                 fig.add_trace(go.Scatter(
                     x=data['timestamp'],
                     y=ma,
@@ -229,8 +254,6 @@ def create_intraday_chart(ticker):
             fig.update_xaxes(rangeslider_visible=True)
             
             return fig
-    except requests.exceptions.ConnectionError:
-        st.error("Could not connect to backend server.")
     except Exception as e:
         st.error(f"Error creating intraday chart: {str(e)}")
     return None
@@ -253,18 +276,16 @@ for category, stocks in POPULAR_STOCKS.items():
                 if symbol not in st.session_state.portfolio:
                     st.sidebar.info(f"Adding {symbol} to portfolio...")
                     try:
-                        quote_response = requests.get(f"{BACKEND_URL}/api/stock/quote/{symbol}")
-                        quote_data = quote_response.json()
+                        quote_data, error = fetch_quote(symbol)
                         
-                        if quote_response.status_code == 200 and quote_data.get('c', 0) > 0:
+                        if quote_data and quote_data.get('c', 0) > 0:
                             st.session_state.portfolio.append(symbol)
                             st.sidebar.success(f"Added {symbol} to portfolio")
                             st.rerun()
+                        elif error == CONNECTION_ERROR:
+                            st.sidebar.error(CONNECTION_ERROR)
                         else:
-                            error_msg = quote_data.get('error', 'Unknown error')
                             st.sidebar.error(f"Could not fetch data for {symbol}")
-                    except requests.exceptions.ConnectionError:
-                        st.sidebar.error("Could not connect to backend server.")
                     except Exception as e:
                         st.sidebar.error(f"Error adding stock: {str(e)}")
                 else:
@@ -291,19 +312,17 @@ if st.sidebar.button("Add") and new_stock:
         if new_stock not in st.session_state.portfolio:
             st.sidebar.info(f"Fetching data for {new_stock}...")
             try:
-                quote_response = requests.get(f"{BACKEND_URL}/api/stock/quote/{new_stock}")
-                quote_data = quote_response.json()
+                quote_data, error = fetch_quote(new_stock)
                 
-                if quote_response.status_code == 200 and quote_data.get('c', 0) > 0:
+                if quote_data and quote_data.get('c', 0) > 0:
                     st.session_state.portfolio.append(new_stock)
                     st.sidebar.success(f"Added {new_stock} to portfolio")
                     st.rerun()
+                elif error == CONNECTION_ERROR:
+                    st.sidebar.error("Could not connect to backend server. Make sure it's running on port 5001.")
                 else:
-                    error_msg = quote_data.get('error', 'Unknown error')
                     st.sidebar.error(f"Could not fetch data for {new_stock}. Please make sure you're using the correct ticker symbol.")
                     st.sidebar.info("Examples: AAPL (Apple), MSFT (Microsoft), GOOGL (Google)")
-            except requests.exceptions.ConnectionError:
-                st.sidebar.error("Could not connect to backend server. Make sure it's running on port 5001.")
             except Exception as e:
                 st.sidebar.error(f"Error adding stock: {str(e)}")
 
@@ -312,6 +331,8 @@ st.sidebar.subheader("Your Portfolio")
 for stock in st.session_state.portfolio:
     if st.sidebar.button(f"Remove {stock}"):
         st.session_state.portfolio.remove(stock)
+        for name in ('chart_series', 'predictions', 'card_refresh', 'card_timers'):
+            st.session_state.get(name, {}).pop(stock, None)
         st.rerun()
 
 # Function to create price range chart
@@ -389,22 +410,116 @@ def create_price_range_chart(quote_data):
     
     return fig
 
-# Function to fetch prediction
-def fetch_prediction(ticker):
+# Per-card auto-refresh choices (seconds); refreshes pause while the market is closed
+REFRESH_OPTIONS = {'Off': None, '15s': 15, '1m': 60, '5m': 300}
+MARKET_TZ = ZoneInfo('America/New_York')
+
+def market_open():
+    """Whether US regular trading hours (9:30-16:00 ET, weekdays) are in progress"""
+    now = datetime.now(MARKET_TZ)
+    return now.weekday() < 5 and (9, 30) <= (now.hour, now.minute) < (16, 0)
+
+def chart_spec(ticker):
+    """Portfolio chart spec for a card, with a since cursor when its series is already held"""
+    time_range, interval = get_chart_selection(ticker)
+    days = range_to_days(time_range)
+    since = chart_cursor(ticker, interval, days)
+    return f"{ticker}:{interval}:{days}" + (f":{since}" if since is not None else ''), (interval, days)
+
+def load_cards(tickers):
+    """Fetch cards concurrently and fold chart deltas into the series held in session state"""
+    specs = {ticker: chart_spec(ticker) for ticker in tickers}
+    cards = fetch_cards(tickers, [spec for spec, _ in specs.values()])
+    for ticker, card in cards.items():
+        if card.get('intraday'):
+            card['intraday'] = merge_chart(ticker, *specs[ticker][1], card['intraday'])
+    return cards
+
+def render_card(ticker):
+    """One stock card; runs as a fragment, so its widgets and refreshes only rerun this card"""
+    # The refresh timer is fixed when the fragment is registered; once the market closes, a full
+    # rerun registers the card again without it instead of polling all evening
+    if st.session_state.card_timers.get(ticker) and not market_open():
+        st.rerun()
+    
+    # A full run prefetches every card at once; reruns of this fragment alone fetch just this card
+    card = st.session_state.prefetched_cards.pop(ticker, None)
+    if card is None:
+        card = load_cards([ticker])[ticker]
+    card_errors = card.get('errors', {})
+    
+    # Company profile
+    profile = card.get('profile')
+    if profile:
+        if profile.get('logo'):
+            st.image(profile['logo'], width=50)
+        st.write(f"**Company:** {profile.get('name', 'N/A')}")
+        st.write(f"**Industry:** {profile.get('finnhubIndustry', 'N/A')}")
+    else:
+        st.warning("Could not fetch company profile")
+    
+    # Auto-refresh is set when the fragment is registered, so a new choice needs a full rerun
+    refresh = st.selectbox("Auto-refresh", list(REFRESH_OPTIONS), key=f"refresh_{ticker}")
+    if refresh != st.session_state.card_refresh.get(ticker, 'Off'):
+        st.session_state.card_refresh[ticker] = refresh
+        st.rerun()
+    if REFRESH_OPTIONS[refresh] and not market_open():
+        st.caption("Auto-refresh is paused while the market is closed.")
+    
+    # Add some spacing
+    st.write("")
+    
+    # Display current quote
     try:
-        url = get_api_url(f"stock/predict/{ticker}")
-        response = requests.get(url, timeout=30)
-        
-        if response.status_code == 200:
-            result = response.json()
-            return result
+        if card.get('quote'):
+            quote = card['quote']
+            current_price = quote.get('c')
+            prev_close = quote.get('pc')
+            
+            if isinstance(current_price, (int, float)) and isinstance(prev_close, (int, float)) and prev_close != 0:
+                change = current_price - prev_close
+                change_percent = (change / prev_close) * 100
+                
+                # Display current price
+                st.write(f"**Current Price:** ${current_price:.2f}")
+                
+                # Display change with color
+                if change >= 0:
+                    st.markdown(f'<p style="color: green">▲ +${abs(change):.2f} (+{abs(change_percent):.2f}%)</p>', unsafe_allow_html=True)
+                else:
+                    st.markdown(f'<p style="color: red">▼ -${abs(change):.2f} (-{abs(change_percent):.2f}%)</p>', unsafe_allow_html=True)
+                
+                # Display previous close
+                st.write(f"**Previous Close:** ${prev_close:.2f}")
+                
+                # Add prediction button and result; training runs as a background job on the backend.
+                # The result is kept so refreshes of the card don't clear it
+                if st.button(f"Predict Next Close for {ticker}", key=f"predict_{ticker}"):
+                    with st.spinner("Calculating prediction..."):
+                        st.session_state.predictions[ticker] = fetch_prediction(ticker)
+                prediction = st.session_state.predictions.get(ticker)
+                if prediction and prediction.get('error'):
+                    st.error(f"Prediction error: {prediction['error']}")
+                elif prediction:
+                    st.success(f"Predicted close for {prediction['date']}: ${prediction['predicted_close']:.2f}")
+                
+                # Add intraday chart
+                fig = create_intraday_chart(ticker, card.get('intraday'), card_errors.get('intraday'))
+                if fig:
+                    st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False}, key=f"chart_{ticker}")
+                
+                # Add more details in an expander
+                with st.expander("More Details"):
+                    st.write(f"**Open:** ${quote['o']:.2f}")
+                    st.write(f"**High:** ${quote['h']:.2f}")
+                    st.write(f"**Low:** ${quote['l']:.2f}")
+            else:
+                st.warning(f"Current Price: ${current_price if current_price else 'N/A'}")
         else:
-            error_msg = response.json().get('error', 'Unknown error') if response.content else f"HTTP {response.status_code}"
-            return {'error': error_msg}
-    except requests.exceptions.RequestException as e:
-        return {'error': f'Connection error: {str(e)}'}
+            error_msg = card_errors.get('quote', 'Unknown error')
+            st.error(f"Error fetching quote: {error_msg}")
     except Exception as e:
-        return {'error': str(e)}
+        st.error(f"Error displaying quote: {str(e)}")
 
 # Main content
 st.title("Stock Portfolio Tracker")
@@ -412,6 +527,15 @@ st.title("Stock Portfolio Tracker")
 if not st.session_state.portfolio:
     st.info("Add stocks to your portfolio using the sidebar")
 else:
+    for name in ('chart_series', 'card_refresh', 'card_timers', 'predictions'):
+        if name not in st.session_state:
+            st.session_state[name] = {}
+    
+    # Load every card concurrently before rendering: one request for quotes and charts plus cached
+    # profiles. Charts already held in session state only ask for the bars since their last one
+    st.session_state.prefetched_cards = load_cards(st.session_state.portfolio)
+    is_open = market_open()
+    
     # Display stock data in a grid
     cols = st.columns(3)
     for i, ticker in enumerate(st.session_state.portfolio):
@@ -421,77 +545,8 @@ else:
             
             # Create a container for each stock card
             with st.container():
-                # Fetch company profile
-                try:
-                    profile_response = requests.get(f"{BACKEND_URL}/api/stock/profile/{ticker}")
-                    if profile_response.status_code == 200:
-                        profile = profile_response.json()
-                        if profile.get('logo'):
-                            st.image(profile['logo'], width=50)
-                        st.write(f"**Company:** {profile.get('name', 'N/A')}")
-                        st.write(f"**Industry:** {profile.get('finnhubIndustry', 'N/A')}")
-                    else:
-                        st.warning("Could not fetch company profile")
-                except requests.exceptions.ConnectionError:
-                    st.error("Could not connect to backend server.")
-                
-                # Add some spacing
-                st.write("")
-                
-                # Fetch current quote
-                try:
-                    quote_response = requests.get(f"{BACKEND_URL}/api/stock/quote/{ticker}")
-                    if quote_response.status_code == 200:
-                        quote = quote_response.json()
-                        current_price = quote.get('c')
-                        prev_close = quote.get('pc')
-                        
-                        if isinstance(current_price, (int, float)) and isinstance(prev_close, (int, float)) and prev_close != 0:
-                            change = current_price - prev_close
-                            change_percent = (change / prev_close) * 100
-                            
-                            # Display current price
-                            st.write(f"**Current Price:** ${current_price:.2f}")
-                            
-                            # Display change with color
-                            if change >= 0:
-                                st.markdown(f'<p style="color: green">▲ +${abs(change):.2f} (+{abs(change_percent):.2f}%)</p>', unsafe_allow_html=True)
-                            else:
-                                st.markdown(f'<p style="color: red">▼ -${abs(change):.2f} (-{abs(change_percent):.2f}%)</p>', unsafe_allow_html=True)
-                            
-                            # Display previous close
-                            st.write(f"**Previous Close:** ${prev_close:.2f}")
-                            
-                            # Add prediction warning and button
-                            st.warning("⚠️ Price predictions are temporarily unavailable due to server memory constraints.")
-                            
-                            # Add prediction button (disabled) and result
-                            if st.button(f"Predict Next Close for {ticker}", key=f"predict_{ticker}", disabled=True):
-                                with st.spinner("Calculating prediction..."):
-                                    prediction = fetch_prediction(ticker)
-                                if prediction.get('error'):
-                                    st.error(f"Prediction error: {prediction['error']}")
-                                else:
-                                    st.success(f"Predicted close for {prediction['date']}: ${prediction['predicted_close']:.2f}")
-                            
-                            # Add intraday chart
-                            fig = create_intraday_chart(ticker)
-                            if fig:
-                                st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
-                            
-                            # Add more details in an expander
-                            with st.expander("More Details"):
-                                st.write(f"**Open:** ${quote['o']:.2f}")
-                                st.write(f"**High:** ${quote['h']:.2f}")
-                                st.write(f"**Low:** ${quote['l']:.2f}")
-                        else:
-                            st.warning(f"Current Price: ${current_price if current_price else 'N/A'}")
-                    else:
-                        error_msg = quote_response.json().get('error', 'Unknown error')
-                        st.error(f"Error fetching quote: {error_msg}")
-                except requests.exceptions.ConnectionError:
-                    st.error("Could not connect to backend server.")
-                except Exception as e:
-                    st.error(f"Error displaying quote: {str(e)}")
+                interval = REFRESH_OPTIONS[st.session_state.card_refresh.get(ticker, 'Off')] if is_open else None
+                st.session_state.card_timers[ticker] = bool(interval)
+                st.fragment(render_card, run_every=interval)(ticker)
                 
                 st.write("---")
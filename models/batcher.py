@@ -0,0 +1,67 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from models.numpy_lstm import predict_many
+
+
+class MicroBatcher:
+    """Gathers concurrent single predictions into one NumPy forward pass.
+
+    The first request to arrive opens a window of `window` seconds; every
+    request received before it closes (up to max_batch) is run together by
+    predict_many, one pass per model architecture, and each caller gets its
+    own result. A lone request waits at most `window` longer than it would
+    have on its own.
+    """
+
+    def __init__(self, window=0.005, max_batch=64):
+        self.window = window
+        self.max_batch = max_batch
+        self._requests = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='predict-batcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, engine, closes):
+        """Queue a prediction, returning a Future for the next close"""
+        self._ensure_started()
+        future = Future()
+        self._requests.put((engine, closes, future))
+        return future
+
+    def predict(self, engine, closes):
+        return self.submit(engine, closes).result()
+
+    def _collect(self):
+        batch = [self._requests.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = predict_many([engine for engine, _, _ in batch], [closes for _, closes, _ in batch])
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            if len(batch) > 1:
+                print(f"DEBUG: Ran {len(batch)} predictions in one batch")
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
@@ -1,4 +1,6 @@
+import math
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout
 from tensorflow.keras.optimizers import Adam
@@ -12,14 +14,35 @@ class LSTMPredictor:
         self.scaler = MinMaxScaler()
         
     def create_sequences(self, data):
-        X, y = [], []
-        data_len = len(data)
-        
-        for i in range(self.sequence_length, data_len):
-            X.append(data[i-self.sequence_length:i])
-            y.append(data[i])
-            
-        return np.array(X), np.array(y)
+        """Input windows of sequence_length rows and the row after each, as views sharing data's memory"""
+        if len(data) <= self.sequence_length:
+            return np.empty((0, self.sequence_length) + data.shape[1:]), data[:0]
+        # (windows, features, sequence_length) -> (windows, sequence_length, features)
+        windows = sliding_window_view(data[:-1], self.sequence_length, axis=0)
+        return np.swapaxes(windows, 1, 2), data[self.sequence_length:]
+    
+    def batches(self, X, y, batch_size, shuffle=True):
+        """Endless (inputs, targets) batches for model.fit, copying only one batch of windows at a time"""
+        while True:
+            order = np.random.permutation(len(X)) if shuffle else np.arange(len(X))
+            for start in range(0, len(X), batch_size):
+                batch = order[start:start + batch_size]
+                yield X[batch], y[batch]
+    
+    def fit(self, X, y, epochs, batch_size, validation=None, verbose=1):
+        """Train on window views through the batch generator"""
+        kwargs = {}
+        if validation is not None and len(validation[0]):
+            kwargs['validation_data'] = self.batches(*validation, batch_size, shuffle=False)
+            kwargs['validation_steps'] = math.ceil(len(validation[0]) / batch_size)
+        return self.model.fit(
+            self.batches(X, y, batch_size),
+            steps_per_epoch=math.ceil(len(X) / batch_size),
+            epochs=epochs,
+            shuffle=False,  # the generator already shuffles window order
+            verbose=verbose,
+            **kwargs
+        )
     
     def build_model(self, input_shape):
         self.model = Sequential([
@@ -61,16 +84,22 @@ class LSTMPredictor:
             self.build_model((self.sequence_length, 1))
         
         # Train model
-        history = self.model.fit(
-            X_train, y_train,
-            epochs=epochs,
-            batch_size=batch_size,
-            validation_data=(X_test, y_test),
-            verbose=1
-        )
+        history = self.fit(X_train, y_train, epochs, batch_size, validation=(X_test, y_test))
         
         return history
     
+    def fine_tune(self, df, new_rows, epochs=3, batch_size=16):
+        """Continue training on the newest new_rows bars, keeping the fitted scaler"""
+        # Each new bar needs the sequence_length bars before it as input
+        close_prices = df['close'].values[-(new_rows + self.sequence_length):].reshape(-1, 1)
+        X, y = self.create_sequences(self.scaler.transform(close_prices))
+        
+        return self.fit(X, y, epochs, batch_size, verbose=0)
+    
+    def covers(self, data):
+        """Whether the fitted scaler's range still covers these prices"""
+        return self.scaler.data_min_[0] <= np.min(data) and np.max(data) <= self.scaler.data_max_[0]
+    
     def predict(self, data):
         # Scale the input data
         scaled_data = self.scaler.transform(data.reshape(-1, 1))
@@ -0,0 +1,122 @@
+import numpy as np
+
+# Exported arrays, in the order of LSTMPredictor.build_model's weighted layers
+WEIGHT_NAMES = [
+    'lstm1_kernel', 'lstm1_recurrent', 'lstm1_bias',
+    'lstm2_kernel', 'lstm2_recurrent', 'lstm2_bias',
+    'dense1_kernel', 'dense1_bias',
+    'dense2_kernel', 'dense2_bias',
+]
+
+
+def export_weights(model, scaler, path):
+    """Save a trained LSTMPredictor network and its MinMaxScaler to an .npz file"""
+    weights = [w for layer in model.layers for w in layer.get_weights()]
+    if len(weights) != len(WEIGHT_NAMES):
+        raise ValueError(f"Expected {len(WEIGHT_NAMES)} weight arrays, model has {len(weights)}")
+    arrays = {name: np.asarray(w, dtype='float32') for name, w in zip(WEIGHT_NAMES, weights)}
+    arrays['scaler_min'] = np.asarray(scaler.min_, dtype='float64')
+    arrays['scaler_scale'] = np.asarray(scaler.scale_, dtype='float64')
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def _sigmoid(x):
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+def _lstm(x, kernel, recurrent, bias):
+    """Run a Keras LSTM layer (gate order i, f, c, o) over (batch, steps, features), returning all states.
+
+    Weights may carry a leading model axis matching x's batch axis (kernel
+    (batch, features, 4u), recurrent (batch, u, 4u), bias (batch, 1, 4u)) to
+    run a different model per sequence in the same pass.
+    """
+    batch, steps, _ = x.shape
+    units = recurrent.shape[-2]
+    # Input projections for every step at once; only the recurrent part is sequential
+    projected = x @ kernel + bias
+    h = np.zeros((batch, 1, units), dtype=x.dtype)
+    c = np.zeros((batch, 1, units), dtype=x.dtype)
+    outputs = np.empty((batch, steps, units), dtype=x.dtype)
+    for t in range(steps):
+        z = projected[:, t:t + 1] + h @ recurrent
+        i = _sigmoid(z[..., :units])
+        f = _sigmoid(z[..., units:2 * units])
+        g = np.tanh(z[..., 2 * units:3 * units])
+        o = _sigmoid(z[..., 3 * units:])
+        c = f * c + i * g
+        h = o * np.tanh(c)
+        outputs[:, t] = h[:, 0]
+    return outputs
+
+
+class NumpyLSTM:
+    """Inference-only copy of an LSTMPredictor model that needs nothing but NumPy.
+
+    Dropout layers are identity at inference, so the forward pass is two LSTM
+    layers followed by two linear Dense layers, matching Keras within float32
+    rounding.
+    """
+
+    def __init__(self, weights, sequence_length):
+        self.weights = {name: weights[name] for name in WEIGHT_NAMES}
+        self.scaler_min = weights['scaler_min']
+        self.scaler_scale = weights['scaler_scale']
+        self.sequence_length = sequence_length
+
+    @classmethod
+    def load(cls, path, sequence_length):
+        with np.load(path) as weights:
+            return cls({name: weights[name] for name in weights.files}, sequence_length)
+
+    def architecture(self):
+        """Weight shapes and sequence length; engines with equal architectures can share a forward pass"""
+        return (self.sequence_length,) + tuple(self.weights[name].shape for name in WEIGHT_NAMES)
+
+    def forward(self, sequences):
+        """Scaled next-value predictions, shape (batch, 1), for scaled inputs of shape (batch, steps, 1)"""
+        return _forward(self.weights, np.asarray(sequences, dtype='float32'))
+
+    def scale(self, data):
+        return np.asarray(data, dtype='float64')[-self.sequence_length:] * self.scaler_scale + self.scaler_min
+
+    def unscale(self, value):
+        return (value - self.scaler_min[0]) / self.scaler_scale[0]
+
+    def predict(self, data):
+        """Next close from a series of closes, like LSTMPredictor.predict"""
+        prediction = self.forward(self.scale(data).reshape(1, -1, 1))
+        return self.unscale(prediction[0][0])
+
+
+def _forward(w, x):
+    x = _lstm(x, w['lstm1_kernel'], w['lstm1_recurrent'], w['lstm1_bias'])
+    x = _lstm(x, w['lstm2_kernel'], w['lstm2_recurrent'], w['lstm2_bias'])[:, -1:]
+    x = x @ w['dense1_kernel'] + w['dense1_bias']
+    return (x @ w['dense2_kernel'] + w['dense2_bias'])[:, 0]
+
+
+def predict_many(engines, series):
+    """Next close for each (engine, closes) pair, running one forward pass per architecture.
+
+    Every sequence may use a different model: the models' weights are
+    stacked along the batch axis so a single batched matmul per step covers
+    all of them.
+    """
+    results = [None] * len(engines)
+    groups = {}
+    for position, engine in enumerate(engines):
+        groups.setdefault(engine.architecture(), []).append(position)
+    for positions in groups.values():
+        group = [engines[p] for p in positions]
+        x = np.stack([engine.scale(series[p]) for engine, p in zip(group, positions)]).astype('float32')
+        weights = {name: np.stack([engine.weights[name] for engine in group]) for name in WEIGHT_NAMES}
+        # Biases broadcast over the step axis
+        for name in WEIGHT_NAMES:
+            if name.endswith('_bias'):
+                weights[name] = weights[name][:, None, :]
+        scaled = _forward(weights, x[..., None])
+        for engine, p, value in zip(group, positions, scaled[:, 0]):
+            results[p] = engine.unscale(value)
+    return results
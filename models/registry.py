@@ -0,0 +1,181 @@
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from models.numpy_lstm import NumpyLSTM, export_weights
+
+MODEL_DIR = os.getenv('MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'store'))
+
+# Bump when the network architecture or preprocessing changes so old weights are retrained
+MODEL_VERSION = 2
+
+# Days of closes the model looks back over; callers need at least this much history
+SEQUENCE_LENGTH = 60
+
+
+class ModelRegistry:
+    """Trained LSTM models per ticker, persisted to disk and kept in a bounded LRU.
+
+    Each ticker gets its own model and MinMaxScaler, saved under
+    root/<TICKER>/ with a meta.json recording the last bar trained on (the
+    data version), plus a NumPy export of the weights. A request whose history
+    has no new bars is served from the saved model; new bars only fine-tune
+    it. engine() serves up-to-date models without TensorFlow. The model is retrained from
+    scratch when none is saved, the saved one is from an older MODEL_VERSION,
+    or new prices fall outside the scaler's fitted range.
+    """
+
+    def __init__(self, root, maxsize=4, sequence_length=SEQUENCE_LENGTH, train_epochs=10, fine_tune_epochs=3):
+        self.root = root
+        self.maxsize = maxsize
+        self.sequence_length = sequence_length
+        self.train_epochs = train_epochs
+        self.fine_tune_epochs = fine_tune_epochs
+        self._models = OrderedDict()  # ticker -> (predictor, meta)
+        self._engines = OrderedDict()  # ticker -> (trained_at, NumpyLSTM)
+        self._lock = threading.Lock()
+        self._ticker_locks = {}
+
+    def _dir(self, ticker):
+        return os.path.join(self.root, ticker.upper())
+
+    def _ticker_lock(self, ticker):
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    def _remember(self, ticker, entry):
+        with self._lock:
+            self._models[ticker] = entry
+            self._models.move_to_end(ticker)
+            while len(self._models) > self.maxsize:
+                evicted, _ = self._models.popitem(last=False)
+                print(f"DEBUG: Evicted model for {evicted} from memory")
+
+    def _read_meta(self, ticker):
+        try:
+            with open(os.path.join(self._dir(ticker), 'meta.json')) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if meta.get('version') != MODEL_VERSION or meta.get('sequence_length') != self.sequence_length:
+            return None
+        return meta
+
+    def _cached(self, ticker):
+        with self._lock:
+            entry = self._models.get(ticker)
+            if entry is not None:
+                self._models.move_to_end(ticker)
+            return entry
+
+    def _load(self, ticker):
+        """Saved (predictor, meta) for a ticker, or None if there is no usable one"""
+        path = self._dir(ticker)
+        meta = self._read_meta(ticker)
+        if meta is None:
+            return None
+
+        # TensorFlow is only imported by the processes that actually run models
+        from tensorflow.keras.models import load_model
+        from models.lstm_predictor import LSTMPredictor
+        predictor = LSTMPredictor(sequence_length=self.sequence_length)
+        predictor.model = load_model(os.path.join(path, 'model.keras'))
+        with open(os.path.join(path, 'scaler.pkl'), 'rb') as f:
+            predictor.scaler = pickle.load(f)
+        print(f"DEBUG: Loaded saved model for {ticker} trained through {meta['last_bar']}")
+        return predictor, meta
+
+    def _save(self, ticker, predictor, meta):
+        """Write model, scaler and meta to a temporary directory and swap it in"""
+        path = self._dir(ticker)
+        tmp = path + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        predictor.model.save(os.path.join(tmp, 'model.keras'))
+        with open(os.path.join(tmp, 'scaler.pkl'), 'wb') as f:
+            pickle.dump(predictor.scaler, f)
+        export_weights(predictor.model, predictor.scaler, os.path.join(tmp, 'weights.npz'))
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        old = path + '.old'
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.isdir(path):
+            os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def get(self, ticker, df):
+        """Predictor for a ticker, trained through the last bar of df (daily OHLCV history)"""
+        ticker = ticker.upper()
+        last_bar = df.index[-1].isoformat()
+        with self._ticker_lock(ticker):
+            entry = self._cached(ticker) or self._load(ticker)
+            predictor, meta = entry if entry is not None else (None, None)
+
+            if meta is not None and meta['last_bar'] >= last_bar:
+                self._remember(ticker, entry)
+                return predictor
+
+            started = time.monotonic()
+            new_rows = int((df.index > pd.Timestamp(meta['last_bar'])).sum()) if meta is not None else len(df)
+            closes = df['close'].values
+            if meta is not None and predictor.covers(closes[-new_rows:]):
+                print(f"DEBUG: Fine-tuning {ticker} model on {new_rows} new bars")
+                predictor.fine_tune(df, new_rows, epochs=self.fine_tune_epochs)
+            else:
+                print(f"DEBUG: Training {ticker} model on {len(df)} bars")
+                from models.lstm_predictor import LSTMPredictor
+                predictor = LSTMPredictor(sequence_length=self.sequence_length)
+                predictor.train(df, epochs=self.train_epochs, batch_size=16)
+
+            meta = {
+                'version': MODEL_VERSION,
+                'sequence_length': self.sequence_length,
+                'last_bar': last_bar,
+                'rows': len(df),
+                'trained_at': time.time(),
+            }
+            self._save(ticker, predictor, meta)
+            self._remember(ticker, (predictor, meta))
+            print(f"DEBUG: {ticker} model ready in {time.monotonic() - started:.1f}s")
+            return predictor
+
+    def engine(self, ticker, last_bar):
+        """NumPy inference engine for a saved model trained through last_bar, or None.
+
+        Needs no TensorFlow, so the API can answer predictions itself whenever
+        no training is due.
+        """
+        ticker = ticker.upper()
+        meta = self._read_meta(ticker)
+        if meta is None or pd.Timestamp(meta['last_bar']) < last_bar:
+            return None
+        with self._lock:
+            cached = self._engines.get(ticker)
+            if cached is not None and cached[0] == meta['trained_at']:
+                self._engines.move_to_end(ticker)
+                return cached[1]
+        try:
+            engine = NumpyLSTM.load(os.path.join(self._dir(ticker), 'weights.npz'), self.sequence_length)
+        except FileNotFoundError:  # retrained and swapped in since meta was read
+            return None
+        with self._lock:
+            self._engines[ticker] = (meta['trained_at'], engine)
+            self._engines.move_to_end(ticker)
+            while len(self._engines) > self.maxsize:
+                self._engines.popitem(last=False)
+        return engine
+
+
+registry = ModelRegistry(
+    MODEL_DIR,
+    maxsize=int(os.getenv('MODEL_CACHE_SIZE', '4')),
+    train_epochs=int(os.getenv('MODEL_TRAIN_EPOCHS', '10')),
+    fine_tune_epochs=int(os.getenv('MODEL_FINE_TUNE_EPOCHS', '3')),
+)
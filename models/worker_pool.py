@@ -0,0 +1,118 @@
+import multiprocessing
+import os
+import queue
+import threading
+
+
+class WorkerCrashed(Exception):
+    """Raised when a model worker process dies while handling a task"""
+
+
+def _rss_mb():
+    """Resident memory of the current process in MB"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource  # peak rather than current RSS, but close enough off Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _predict(ticker, history, closes):
+    """Next close for a ticker from its registry model, trained through history's last bar"""
+    from models.registry import registry
+    return float(registry.get(ticker, history).predict(closes))
+
+
+def _warmup():
+    """Import TensorFlow and the registry so the first real task doesn't pay for it"""
+    import tensorflow  # noqa: F401
+    import models.registry  # noqa: F401
+    return os.getpid()
+
+
+TASKS = {'predict': _predict, 'warmup': _warmup}
+
+
+def _serve(conn, max_rss_mb):
+    """Worker process loop: run tasks until the pipe closes or memory exceeds the ceiling"""
+    while True:
+        try:
+            task, args = conn.recv()
+        except EOFError:
+            return
+        try:
+            reply = (True, TASKS[task](*args))
+        except Exception as e:
+            reply = (False, str(e))
+        recycle = bool(max_rss_mb) and _rss_mb() > max_rss_mb
+        conn.send(reply + (recycle,))
+        if recycle:
+            print(f"DEBUG: Model worker {os.getpid()} exceeded {max_rss_mb}MB, exiting to be replaced")
+            return
+
+
+class ModelWorkerPool:
+    """Long-lived processes that load TensorFlow and run model tasks.
+
+    Workers are started with 'spawn', so they don't inherit the web worker's
+    memory and the web process never imports TensorFlow itself. Each worker
+    handles one task at a time and is reused across tasks. A worker whose RSS
+    exceeds max_rss_mb after a task (0 disables the check), or that dies, is
+    replaced with a fresh process. Processes start on the first task.
+    """
+
+    def __init__(self, workers=1, max_rss_mb=0):
+        self.workers = workers
+        self.max_rss_mb = max_rss_mb
+        self._ctx = multiprocessing.get_context('spawn')
+        self._idle = queue.Queue()
+        self._started = False
+        self._lock = threading.Lock()
+
+    def _spawn(self):
+        parent, child = self._ctx.Pipe()
+        process = self._ctx.Process(target=_serve, args=(child, self.max_rss_mb), name='model-worker', daemon=True)
+        process.start()
+        child.close()
+        return process, parent
+
+    def _retire(self, process, conn):
+        conn.close()
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+
+    def _ensure_started(self):
+        with self._lock:
+            if not self._started:
+                for _ in range(self.workers):
+                    self._idle.put(self._spawn())
+                self._started = True
+
+    def warm(self):
+        """Start every worker and have each load TensorFlow now rather than on its first task"""
+        self._ensure_started()
+        # Idle workers are handed out in FIFO order, so consecutive calls reach each worker once
+        for _ in range(self.workers):
+            self.call('warmup')
+
+    def call(self, task, *args):
+        """Run a task on the next idle worker and return its result"""
+        self._ensure_started()
+        process, conn = self._idle.get()
+        recycle = True
+        try:
+            conn.send((task, args))
+            ok, value, recycle = conn.recv()
+        except (EOFError, OSError):
+            raise WorkerCrashed(f"Model worker exited while running {task} (exit code {process.exitcode})")
+        finally:
+            if recycle:
+                self._retire(process, conn)
+                process, conn = self._spawn()
+            self._idle.put((process, conn))
+        if not ok:
+            raise RuntimeError(value)
+        return value
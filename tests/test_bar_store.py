@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.bar_store import BarStore
+
+
+def bars(start, periods, first_close=100.0):
+    index = pd.date_range(start, periods=periods, freq='5min', tz='UTC', name='timestamp')
+    close = first_close + np.arange(periods, dtype='float64')
+    return pd.DataFrame({'open': close - 0.5, 'high': close + 1, 'low': close - 1, 'close': close,
+                         'volume': np.full(periods, 10.0)}, index=index)
+
+
+def test_replace_then_append_keeps_only_newer_bars(tmp_path):
+    store = BarStore(str(tmp_path))
+    first = bars('2026-10-14 13:30', 6)
+    store.replace('aapl', '5m', first, int(first.index[0].timestamp()))
+
+    # Overlaps the last two stored bars; only the four new ones are added
+    added = store.append('AAPL', '5m', bars('2026-10-14 13:50', 6, first_close=104.0))
+
+    assert added == 4
+    meta = store.info('AAPL', '5m')
+    assert meta['rows'] == 10
+    assert meta['start'] == int(first.index[0].timestamp())
+    assert meta['last'] == int(pd.Timestamp('2026-10-14 14:15', tz='UTC').timestamp())
+    df = store.read('AAPL', '5m')
+    assert df.index.is_monotonic_increasing and df.index.is_unique
+    assert df['close'].tolist() == [100.0 + n for n in range(10)]
+    assert str(df.index.tz) == 'UTC'
+
+
+def test_read_and_iter_chunks_select_the_window(tmp_path):
+    store = BarStore(str(tmp_path))
+    df = bars('2026-10-14 13:30', 20)
+    store.replace('AAPL', '5m', df, int(df.index[0].timestamp()))
+    start, end = int(df.index[5].timestamp()), int(df.index[14].timestamp())
+
+    window = store.read('AAPL', '5m', start, end)
+    chunks = list(store.iter_chunks('AAPL', '5m', start, end, rows=4))
+
+    assert window.index.equals(df.index[5:15])
+    assert [len(chunk['timestamp']) for chunk in chunks] == [4, 4, 2]
+    assert np.concatenate([chunk['close'] for chunk in chunks]).tolist() == df['close'].iloc[5:15].tolist()
+
+
+def test_replace_discards_previous_bars(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.replace('AAPL', '5m', bars('2026-10-01 13:30', 5), 0)
+    fresh = bars('2026-10-14 13:30', 3, first_close=200.0)
+    store.replace('AAPL', '5m', fresh, int(fresh.index[0].timestamp()))
+
+    assert store.read('AAPL', '5m')['close'].tolist() == [200.0, 201.0, 202.0]
+    assert store.info('AAPL', '5m')['start'] == int(fresh.index[0].timestamp())
+
+
+def test_append_needs_replace_first(tmp_path):
+    with pytest.raises(ValueError):
+        BarStore(str(tmp_path)).append('AAPL', '5m', bars('2026-10-14 13:30', 2))
+
+
+def test_uncommitted_bytes_from_an_interrupted_append_are_dropped(tmp_path):
+    store = BarStore(str(tmp_path))
+    df = bars('2026-10-14 13:30', 3)
+    store.replace('AAPL', '5m', df, int(df.index[0].timestamp()))
+    with open(os.path.join(str(tmp_path), 'AAPL', '5m', 'close.f8'), 'ab') as f:
+        f.write(np.array([999.0]).tobytes())  # written but never committed to meta.json
+
+    store.append('AAPL', '5m', bars('2026-10-14 13:45', 1, first_close=103.0))
+
+    assert store.read('AAPL', '5m')['close'].tolist() == [100.0, 101.0, 102.0, 103.0]
@@ -0,0 +1,41 @@
+import asyncio
+
+from backend.app.cache import TTLCache
+
+
+def test_cancelled_leader_does_not_break_shared_async_load():
+    cache = TTLCache(60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'quote'
+
+    async def run():
+        leader = asyncio.ensure_future(cache.get_or_load_async('AAPL', loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.get_or_load_async('AAPL', loader))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await waiter, leader.cancelled()
+
+    assert asyncio.run(run()) == ('quote', True)
+    assert calls == [1]
+    assert cache.get('AAPL') == 'quote'
+
+
+def test_async_load_failure_reaches_every_caller_and_is_not_cached():
+    cache = TTLCache(60)
+
+    async def loader():
+        await asyncio.sleep(0.01)
+        raise ValueError('upstream down')
+
+    async def run():
+        return await asyncio.gather(cache.get_or_load_async('AAPL', loader),
+                                    cache.get_or_load_async('AAPL', loader), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert [type(r) for r in results] == [ValueError, ValueError]
+    assert cache.get('AAPL') is None
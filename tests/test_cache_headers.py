@@ -0,0 +1,42 @@
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+os.environ.setdefault('FINNHUB_API_KEY', 'testkey12345')
+
+from backend.app import routes  # noqa: E402
+from backend.app.config import QUOTE_CACHE_TTL, INTRADAY_CACHE_TTL, MARKET_CLOSED_MAX_AGE, PROFILE_CACHE_TTL  # noqa: E402
+
+
+def pin_clock(monkeypatch, utc):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return utc.astimezone(tz) if tz else utc.replace(tzinfo=None)
+
+    monkeypatch.setattr(routes, 'datetime', FrozenDatetime)
+
+
+@pytest.mark.parametrize('utc, status', [
+    (datetime(2026, 10, 14, 13, 0, tzinfo=timezone.utc), 'pre_market'),  # 09:00 ET
+    (datetime(2026, 10, 14, 17, 0, tzinfo=timezone.utc), 'open'),        # 13:00 ET, after 16:00 UTC
+    (datetime(2026, 10, 14, 21, 30, tzinfo=timezone.utc), 'closed'),     # 17:30 ET
+    (datetime(2026, 10, 17, 17, 0, tzinfo=timezone.utc), 'closed_weekend'),
+])
+def test_market_status_uses_new_york_time(monkeypatch, utc, status):
+    pin_clock(monkeypatch, utc)
+    assert routes.get_market_status() == status
+
+
+def test_max_age_during_trading_on_utc_clock(monkeypatch):
+    pin_clock(monkeypatch, datetime(2026, 10, 14, 17, 0, tzinfo=timezone.utc))
+    assert routes.max_age('quote') == QUOTE_CACHE_TTL
+    assert routes.max_age('chart') == INTRADAY_CACHE_TTL
+    assert routes.max_age('profile') == PROFILE_CACHE_TTL
+
+
+def test_max_age_after_close(monkeypatch):
+    pin_clock(monkeypatch, datetime(2026, 10, 14, 21, 30, tzinfo=timezone.utc))
+    assert routes.max_age('quote') == MARKET_CLOSED_MAX_AGE
+    assert routes.max_age('chart') == MARKET_CLOSED_MAX_AGE
@@ -0,0 +1,59 @@
+import numpy as np
+
+from data.downsample import downsample_bars, lttb_indices
+
+
+def columns(length, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, length))
+    return {
+        'timestamp': 1_700_000_000 + 60 * np.arange(length),
+        'open': close + rng.normal(0, 0.2, length),
+        'high': close + rng.uniform(0.1, 2, length),
+        'low': close - rng.uniform(0.1, 2, length),
+        'close': close,
+        'volume': rng.uniform(100, 1000, length),
+    }
+
+
+def test_downsample_keeps_endpoints_and_envelope():
+    source = columns(1000)
+    # A spike that LTTB must keep and the envelope must cover
+    source['close'][437] += 50
+    source['high'][437] = source['close'][437] + 1
+
+    out = downsample_bars(source, 100)
+
+    assert all(len(values) == 100 for values in out.values())
+    assert out['timestamp'][0] == source['timestamp'][0]
+    assert out['timestamp'][-1] == source['timestamp'][-1]
+    assert out['close'][0] == source['close'][0] and out['close'][-1] == source['close'][-1]
+    assert np.all(np.diff(out['timestamp']) > 0)
+    assert source['close'][437] in out['close']
+    assert out['high'].max() == source['high'].max()
+    assert out['low'].min() == source['low'].min()
+    assert np.isclose(out['volume'].sum(), source['volume'].sum())
+
+
+def test_each_bar_covers_its_run_of_source_bars():
+    source = columns(10)
+
+    out = downsample_bars(source, 3)
+
+    edges = np.linspace(0, 10, 4).astype(int)
+    for n, (lo, hi) in enumerate(zip(edges[:-1], edges[1:])):
+        assert out['open'][n] == source['open'][lo]
+        assert out['high'][n] == source['high'][lo:hi].max()
+        assert out['low'][n] == source['low'][lo:hi].min()
+        assert lo <= np.searchsorted(source['timestamp'], out['timestamp'][n]) < hi
+
+
+def test_short_series_is_returned_unchanged():
+    source = columns(50)
+    assert downsample_bars(source, 50) is source
+
+
+def test_lttb_picks_one_point_per_bucket():
+    picked = lttb_indices(np.sin(np.linspace(0, 20, 500)), 40)
+    assert len(picked) == 40 and picked[0] == 0 and picked[-1] == 499
+    assert np.all(np.diff(picked) > 0)
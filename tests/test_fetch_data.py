@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from data.bar_store import BarStore
+from data.fetch_data import DataFetcher
+from data.provider_health import ProviderHealth
+
+
+def minute_bars(start, end):
+    """Yahoo-style 1m bars covering [start, end)"""
+    index = pd.date_range(pd.Timestamp(start.timestamp(), unit='s', tz='UTC'),
+                          pd.Timestamp(end.timestamp(), unit='s', tz='UTC'), freq='1min', inclusive='left')
+    values = np.arange(len(index), dtype='float64') + 100
+    return pd.DataFrame({'open': values, 'high': values + 1, 'low': values - 1, 'close': values,
+                         'volume': np.ones(len(index))}, index=index.rename('timestamp'))
+
+
+def stub_fetcher(tmp_path, max_age=timedelta(days=7)):
+    """A DataFetcher over a temporary store whose Yahoo downloads are served locally and recorded"""
+    fetcher = DataFetcher(store=BarStore(str(tmp_path)), health=ProviderHealth())
+    requests = []
+
+    def download(ticker, interval, start_date, end_date):
+        requests.append((start_date, end_date))
+        if datetime.now() - start_date > max_age:
+            return minute_bars(start_date, start_date)  # Yahoo answers out-of-range requests with nothing
+        return minute_bars(start_date, end_date)
+
+    fetcher._download_yahoo = download
+    return fetcher, requests
+
+
+def test_recent_store_fetches_only_the_tail(tmp_path):
+    fetcher, requests = stub_fetcher(tmp_path)
+    end = datetime.now().replace(second=0, microsecond=0)
+    start = end - timedelta(hours=8)
+    fetcher.get_bars('AAPL', '1m', start - timedelta(hours=1), end - timedelta(hours=1))
+    stored_last = fetcher.store.info('AAPL', '1m')['last']
+
+    df = fetcher.get_bars('AAPL', '1m', start, end)
+
+    assert requests[-1][0] == datetime.fromtimestamp(stored_last)
+    assert len(df) and df.index[-1] >= pd.Timestamp(end - timedelta(minutes=2)).tz_localize('UTC')
+
+
+def test_stale_store_refetches_the_window(tmp_path):
+    fetcher, requests = stub_fetcher(tmp_path)
+    end = datetime.now().replace(second=0, microsecond=0)
+    old_end = end - timedelta(days=10)
+    fetcher.store.replace('AAPL', '1m', minute_bars(old_end - timedelta(days=20), old_end),
+                          int((old_end - timedelta(days=20)).timestamp()))
+    start = end - timedelta(hours=8)
+
+    df = fetcher.get_bars('AAPL', '1m', start, end)
+
+    assert requests == [(start, end)]
+    assert len(df) >= 8 * 60 - 2
+    assert fetcher.store.info('AAPL', '1m')['start'] == int(start.timestamp())
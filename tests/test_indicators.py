@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.indicators import IndicatorEngine, compute, parse_specs, session_keys
+
+TZ = 'America/New_York'
+SPECS = parse_specs('sma:20,ema:12,rsi:14,macd,bbands:20:2,atr:14,vwap')
+
+
+def intraday_columns(sessions=4, seed=1):
+    """5m bars over several regular sessions, as the chart endpoints pass them"""
+    rng = np.random.default_rng(seed)
+    index = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(f'2026-10-{12 + day} 09:30', periods=78, freq='5min', tz=TZ) for day in range(sessions)
+    ]))
+    close = 100 + np.cumsum(rng.normal(0, 0.5, len(index)))
+    spread = rng.uniform(0.05, 0.6, len(index))
+    return {
+        'timestamp': index.tz_convert('UTC').tz_localize(None).as_unit('s').asi8,
+        'open': close + rng.normal(0, 0.1, len(index)),
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.uniform(1e3, 1e4, len(index)),
+    }
+
+
+def window(columns, start, stop):
+    return {name: values[start:stop].copy() for name, values in columns.items()}
+
+
+def assert_matches_compute(result, columns):
+    expected = compute(columns, SPECS, session_keys(columns['timestamp'], TZ))
+    np.testing.assert_array_equal(result['timestamp'], columns['timestamp'])
+    for name, values in expected.items():
+        np.testing.assert_allclose(result[name], values, rtol=1e-9, atol=1e-9, err_msg=name)
+
+
+def test_incremental_updates_match_compute():
+    full = intraday_columns()
+    engine = IndicatorEngine(SPECS)
+
+    assert_matches_compute(engine.update(window(full, 0, 150), TZ), window(full, 0, 150))
+    # New bars arrive a few at a time, including across a session boundary for VWAP
+    for stop in (151, 155, 160, 200, len(full['timestamp'])):
+        columns = window(full, 0, stop)
+        assert_matches_compute(engine.update(columns, TZ), columns)
+
+
+def test_revised_last_bar_is_recomputed():
+    full = intraday_columns()
+    engine = IndicatorEngine(SPECS)
+    engine.update(window(full, 0, 120), TZ)
+
+    forming = window(full, 0, 120)
+    forming['close'][-1] += 2.5
+    forming['high'][-1] = max(forming['high'][-1], forming['close'][-1])
+    forming['volume'][-1] *= 3
+    assert_matches_compute(engine.update(forming, TZ), forming)
+
+    # The bar is finalized with different values and a new one arrives
+    final = window(full, 0, 121)
+    assert_matches_compute(engine.update(final, TZ), final)
+
+
+def test_sliding_window_and_rebuild():
+    full = intraday_columns()
+    engine = IndicatorEngine(SPECS)
+    engine.update(window(full, 0, 200), TZ)
+
+    # Old bars leave the window as new ones arrive; results are relative to the longer history
+    result = engine.update(window(full, 40, 240), TZ)
+    expected = compute(window(full, 0, 240), SPECS, session_keys(full['timestamp'][:240], TZ))
+    np.testing.assert_array_equal(result['timestamp'], full['timestamp'][40:240])
+    for name, values in expected.items():
+        np.testing.assert_allclose(result[name], values[40:], rtol=1e-9, atol=1e-9, err_msg=name)
+
+    # A series that starts earlier than anything seen is recomputed from scratch
+    columns = window(full, 0, 100)
+    assert_matches_compute(engine.update(columns, TZ), columns)
+
+
+def test_parse_specs_rejects_unknown_indicators():
+    with pytest.raises(ValueError):
+        parse_specs('sma:20,foo')
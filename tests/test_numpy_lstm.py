@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from models.numpy_lstm import NumpyLSTM, export_weights, predict_many
+
+
+def random_engine(rng, units=8, dense=4, sequence_length=20):
+    shapes = {
+        'lstm1_kernel': (1, 4 * units), 'lstm1_recurrent': (units, 4 * units), 'lstm1_bias': (4 * units,),
+        'lstm2_kernel': (units, 4 * units), 'lstm2_recurrent': (units, 4 * units), 'lstm2_bias': (4 * units,),
+        'dense1_kernel': (units, dense), 'dense1_bias': (dense,),
+        'dense2_kernel': (dense, 1), 'dense2_bias': (1,),
+    }
+    weights = {name: rng.normal(0, 0.3, shape).astype('float32') for name, shape in shapes.items()}
+    weights['scaler_min'] = np.array([-rng.uniform(0.5, 1.0)])
+    weights['scaler_scale'] = np.array([rng.uniform(0.005, 0.02)])
+    return NumpyLSTM(weights, sequence_length)
+
+
+def test_predict_many_matches_each_engine():
+    rng = np.random.default_rng(7)
+    # Two architectures, so the batch runs as two stacked passes
+    engines = [random_engine(rng) for _ in range(3)] + [random_engine(rng, units=6, sequence_length=15) for _ in range(2)]
+    engines.append(engines[0])  # the same model twice in one batch
+    series = [100 + np.cumsum(rng.normal(0, 1, 40)) for _ in engines]
+
+    batched = predict_many(engines, series)
+
+    expected = [engine.predict(closes) for engine, closes in zip(engines, series)]
+    np.testing.assert_allclose(batched, expected, rtol=1e-5)
+
+
+def test_numpy_forward_matches_keras(tmp_path):
+    pytest.importorskip('tensorflow')
+    from sklearn.preprocessing import MinMaxScaler
+    from models.lstm_predictor import LSTMPredictor
+
+    rng = np.random.default_rng(3)
+    closes = 100 + np.cumsum(rng.normal(0, 1, 120))
+    predictor = LSTMPredictor(sequence_length=30)
+    predictor.build_model((30, 1))
+    predictor.scaler = MinMaxScaler().fit(closes.reshape(-1, 1))
+    export_weights(predictor.model, predictor.scaler, str(tmp_path / 'model.npz'))
+    engine = NumpyLSTM.load(str(tmp_path / 'model.npz'), 30)
+
+    windows = np.stack([predictor.scaler.transform(closes[i:i + 30].reshape(-1, 1)) for i in range(0, 90, 15)])
+    expected = predictor.model.predict(windows.astype('float32'), verbose=0)
+
+    np.testing.assert_allclose(engine.forward(windows), expected, rtol=1e-4, atol=1e-5)
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from data.resample import base_interval, resample_bars
+
+
+def minute_bars(session_starts, minutes, tz='America/New_York'):
+    index = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(start, periods=minutes, freq='1min', tz=tz) for start in session_starts
+    ]), name='timestamp')
+    n = np.arange(len(index), dtype='float64')
+    return pd.DataFrame({'open': 100 + n, 'high': 101 + n + (n % 3), 'low': 99 + n - (n % 2),
+                         'close': 100.5 + n, 'volume': 10 + n}, index=index)
+
+
+def test_intraday_bars_aggregate_ohlcv_per_bucket():
+    df = minute_bars(['2026-10-14 09:30'], 12)
+
+    out = resample_bars(df, '5m')
+
+    assert out.index.tolist() == [pd.Timestamp(f'2026-10-14 09:{m}', tz='America/New_York') for m in ('30', '35', '40')]
+    for label, (lo, hi) in zip(out.index, [(0, 5), (5, 10), (10, 12)]):
+        chunk = df.iloc[lo:hi]
+        row = out.loc[label]
+        assert row['open'] == chunk['open'].iloc[0]
+        assert row['high'] == chunk['high'].max()
+        assert row['low'] == chunk['low'].min()
+        assert row['close'] == chunk['close'].iloc[-1]
+        assert row['volume'] == chunk['volume'].sum()
+
+
+def test_hourly_buckets_align_to_each_session_open():
+    df = minute_bars(['2026-10-14 09:30', '2026-10-15 09:30'], 90)
+
+    out = resample_bars(df, '1h')
+
+    assert [ts.strftime('%m-%d %H:%M') for ts in out.index] == ['10-14 09:30', '10-14 10:30', '10-15 09:30', '10-15 10:30']
+    assert out['volume'].sum() == df['volume'].sum()
+
+
+def test_daily_bars_and_gaps():
+    df = minute_bars(['2026-10-14 09:30', '2026-10-15 09:30'], 30)
+    df.iloc[3, df.columns.get_loc('close')] = np.nan  # incomplete bars are skipped
+
+    out = resample_bars(df, '1d')
+
+    assert len(out) == 2
+    day = df.iloc[:30].drop(df.index[3])
+    assert out.iloc[0][['open', 'high', 'low', 'close', 'volume']].tolist() == [
+        day['open'].iloc[0], day['high'].max(), day['low'].min(), day['close'].iloc[-1], day['volume'].sum()]
+
+
+def test_base_interval_shares_one_download_per_range():
+    assert base_interval('15m', 5) == '5m'
+    assert base_interval('1h', 30) == '30m'
+    assert base_interval('1wk', 365) == '1d'
+    assert base_interval('1m', 5) == '1m'  # finer than the range's base is fetched as is
@@ -0,0 +1,36 @@
+import time
+
+import pytest
+
+from data.scheduler import RateLimited, UpstreamScheduler
+
+
+def test_cancelled_calls_do_not_spend_tokens():
+    # Burst of two, refilling one token per second
+    scheduler = UpstreamScheduler({'test': (62, 2)}, workers=2)
+    calls = []
+    for future in [scheduler.submit('test', calls.append, n) for n in range(2)]:
+        future.result(timeout=2)
+    assert scheduler.status()['test']['wait'] > 0
+
+    # Queued behind the empty bucket, then dropped before their turn (like hedge losers)
+    queued = [scheduler.submit('test', calls.append, n, max_wait=60) for n in range(2)]
+    for future in queued:
+        assert future.cancel()
+    assert scheduler.status()['test']['queued'] == 0
+
+    # Once the bucket has refilled, the cancelled calls must not have taken its tokens
+    time.sleep(2.3)
+    status = scheduler.status()['test']
+    assert status == {'queued': 0, 'inflight': 0, 'wait': 0}
+    live = [scheduler.submit('test', calls.append, n, max_wait=0.1) for n in ('a', 'b')]
+    for future in live:
+        future.result(timeout=2)
+    assert calls == [0, 1, 'a', 'b']
+
+
+def test_calls_over_budget_fail_fast():
+    scheduler = UpstreamScheduler({'test': (3, 1)}, workers=1)
+    scheduler.submit('test', lambda: None).result(timeout=2)
+    with pytest.raises(RateLimited):
+        scheduler.submit('test', lambda: None, max_wait=1)
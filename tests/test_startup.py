@@ -0,0 +1,17 @@
+import builtins
+import os
+
+os.environ.setdefault('FINNHUB_API_KEY', 'testkey12345')
+
+
+def test_import_timer_only_wraps_import_while_creating_the_app():
+    original = builtins.__import__
+    import backend.app
+    from backend.app.startup import import_timer, report
+
+    assert builtins.__import__ is original
+    app = backend.app.create_app()
+
+    assert builtins.__import__ is original
+    assert app.test_client().get('/api/health/startup').status_code == 200
+    assert import_timer.elapsed is not None and report()['startup_seconds'] is not None